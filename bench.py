@@ -0,0 +1,151 @@
+"""
+DDA benchmarks
+
+Times the line engines and a full headless frame on random scenes and
+appends the numbers to a JSON history so runs can be compared.
+
+python bench.py                       (all sizes, compare with last run)
+python bench.py --sizes 10,1000 --budget 5
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import time
+
+import numpy as np
+
+from dda import dda_line_points, dda_batch
+
+SCENE_SIZES = [10, 1_000, 100_000, 1_000_000]
+RESULTS_FILE = "bench_results.json"
+GRID_COLS, GRID_ROWS = 40, 35  # Default window grid: 800x700 px at 20 px cells
+
+
+def make_scene(num_lines, cols=GRID_COLS, rows=GRID_ROWS, seed=0):
+    """N x 4 int64 array of random (x1, y1, x2, y2) endpoints inside the grid."""
+    rng = np.random.default_rng(seed)
+    xs = rng.integers(0, cols, size=(num_lines, 2))
+    ys = rng.integers(0, rows, size=(num_lines, 2))
+    return np.stack([xs[:, 0], ys[:, 0], xs[:, 1], ys[:, 1]], axis=1)
+
+def verify_batch(endpoints, sample=1_000, seed=0):
+    """Check dda_batch against dda_line_points on a sample of the scene."""
+    picks = random.Random(seed).sample(range(len(endpoints)), min(sample, len(endpoints)))
+    xs, ys, offsets = dda_batch(endpoints[picks])
+    for k, (x1, y1, x2, y2) in enumerate(endpoints[picks].tolist()):
+        got = list(zip(xs[offsets[k]:offsets[k + 1]].tolist(), ys[offsets[k]:offsets[k + 1]].tolist()))
+        if got != dda_line_points((x1, y1), (x2, y2)):
+            raise AssertionError(f"dda_batch differs from dda_line_points for {(x1, y1, x2, y2)}")
+
+def run_scalar(endpoints):
+    points = 0
+    for x1, y1, x2, y2 in endpoints.tolist():
+        points += len(dda_line_points((x1, y1), (x2, y2)))
+    return points
+
+def run_batch(endpoints):
+    return int(dda_batch(endpoints)[2][-1])
+
+def run_fixed(endpoints):
+    return int(dda_batch(endpoints, fixed_point=True)[2][-1])
+
+def run_frame(endpoints):
+    """Rebuild the line layer and draw every panel once, as on the first frame."""
+    import main
+    if main.screen is None:
+        main.init_display(headless=True)
+    main.lines.clear()
+    main.lines.extend(endpoints, np.arange(len(endpoints)) % len(main.color_options))
+    start = time.perf_counter()
+    main.rebuild_line_layer(main.pygame.Rect(main.LEFT_PANEL_WIDTH, 0, main.RIGHT_PANEL_WIDTH, main.WINDOW_HEIGHT))
+    main.panels_dirty = True
+    main.draw_ui_panels(main.screen)
+    elapsed = time.perf_counter() - start
+    main.lines.clear()
+    main.row_cache.clear()
+    return elapsed
+
+ENGINES = {"scalar": run_scalar, "batch": run_batch, "fixed": run_fixed}
+
+def bench(sizes, engines, frame=True, budget=30.0, repeat=3):
+    """
+    Time each engine on each scene size. An engine whose last size took
+    longer than `budget` seconds is skipped for the larger sizes.
+    """
+    results = []
+    over_budget = set()
+    for size in sizes:
+        endpoints = make_scene(size)
+        verify_batch(endpoints)
+        for name in engines:
+            if name in over_budget:
+                results.append({"engine": name, "lines": size, "skipped": True})
+                continue
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                points = ENGINES[name](endpoints)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+                if elapsed > budget:
+                    break
+            results.append({"engine": name, "lines": size, "points": points, "seconds": best,
+                            "lines_per_sec": size / best, "points_per_sec": points / best})
+            if best > budget:
+                over_budget.add(name)
+        if frame:
+            if "frame" in over_budget:
+                results.append({"engine": "frame", "lines": size, "skipped": True})
+                continue
+            elapsed = run_frame(endpoints)
+            results.append({"engine": "frame", "lines": size, "seconds": elapsed})
+            if elapsed > budget:
+                over_budget.add("frame")
+    return results
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+def save_run(path, results):
+    history = load_history(path)
+    history.append({"time": time.strftime("%Y-%m-%d %H:%M:%S"), "python": platform.python_version(),
+                    "machine": platform.machine(), "results": results})
+    with open(path, "w") as f:
+        json.dump(history, f, indent=1)
+
+def print_results(results, previous=None):
+    previous = {(r["engine"], r["lines"]): r for r in previous or [] if not r.get("skipped")}
+    print(f"{'engine':<8}{'lines':>10}{'seconds':>12}{'lines/s':>14}{'points/s':>14}{'vs last':>10}")
+    for r in results:
+        if r.get("skipped"):
+            print(f"{r['engine']:<8}{r['lines']:>10}{'skipped':>12}")
+            continue
+        last = previous.get((r["engine"], r["lines"]))
+        change = f"{last['seconds'] / r['seconds']:.2f}x" if last else "-"
+        lines_rate = f"{r['lines_per_sec']:.0f}" if "lines_per_sec" in r else "-"
+        points_rate = f"{r['points_per_sec']:.0f}" if "points_per_sec" in r else "-"
+        print(f"{r['engine']:<8}{r['lines']:>10}{r['seconds']:>12.4f}{lines_rate:>14}{points_rate:>14}{change:>10}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(map(str, SCENE_SIZES)), help="comma separated line counts")
+    parser.add_argument("--engines", default=",".join(ENGINES), help="comma separated subset of " + ", ".join(ENGINES))
+    parser.add_argument("--no-frame", action="store_true", help="skip the full-frame render timing")
+    parser.add_argument("--budget", type=float, default=30.0, help="seconds before larger sizes are skipped")
+    parser.add_argument("--output", default=RESULTS_FILE, help="JSON history file")
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+    engines = [e for e in args.engines.split(",") if e]
+    history = load_history(args.output)
+    results = bench(sizes, engines, frame=not args.no_frame, budget=args.budget)
+    print_results(results, history[-1]["results"] if history else None)
+    save_run(args.output, results)
+
+if __name__ == "__main__":
+    main()
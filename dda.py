@@ -0,0 +1,76 @@
+"""
+DDA line math
+
+Headless core shared by the pygame demo and the benchmarks; nothing here
+imports pygame. dda_batch rasterizes many lines at once with NumPy: its
+float path reproduces dda_line_points point for point and its fixed-point
+path uses integers only.
+"""
+
+import numpy as np
+
+
+def get_cell(pos, grid_rect, cell_size, offset=(0, 0)):
+    """Cell under a screen position; offset is where cell (0, 0) sits inside grid_rect."""
+    if not grid_rect.collidepoint(pos): return None
+    x = pos[0] - grid_rect.x - offset[0]; y = pos[1] - grid_rect.y - offset[1]
+    return int(x // cell_size), int(y // cell_size)
+
+def line_metrics(pointA, pointB):
+    """(dx, dy, steps, x_inc, y_inc) for the line from pointA to pointB."""
+    dx = pointB[0] - pointA[0]; dy = pointB[1] - pointA[1]
+    steps = max(abs(dx), abs(dy))
+    if steps == 0: return dx, dy, steps, 0, 0
+    return dx, dy, steps, dx / steps, dy / steps
+
+def dda_line_points(pointA, pointB):
+    x1, y1 = pointA
+    dx, dy, steps, x_inc, y_inc = line_metrics(pointA, pointB)
+    if steps == 0: return [pointA]
+    return [(int(round(x1 + i * x_inc)), int(round(y1 + i * y_inc))) for i in range(steps + 1)]
+
+def _as_endpoints(endpoints):
+    endpoints = np.asarray(endpoints, dtype=np.int64).reshape(-1, 4)
+    return endpoints[:, 0], endpoints[:, 1], endpoints[:, 2], endpoints[:, 3]
+
+def _round_half_even(num, den):
+    # Integer num / den rounded like Python's round(), den > 0
+    q, r = np.divmod(num, den)
+    twice = 2 * r
+    return q + ((twice > den) | ((twice == den) & (q & 1 == 1)))
+
+def dda_batch(endpoints, fixed_point=False):
+    """
+    Rasterize an N x 4 array of (x1, y1, x2, y2) endpoints.
+
+    Returns (xs, ys, offsets): the cells of line k are
+    xs[offsets[k]:offsets[k + 1]], ys[offsets[k]:offsets[k + 1]].
+
+    fixed_point=False matches dda_line_points exactly, including its float
+    rounding. fixed_point=True steps each coordinate as an exact integer
+    fraction of `steps`, so very long lines never drift; it is exact while
+    steps * (|x1| + |dx|) fits in an int64.
+    """
+    x1, y1, x2, y2 = _as_endpoints(endpoints)
+    dx = x2 - x1; dy = y2 - y1
+    steps = np.maximum(np.abs(dx), np.abs(dy))
+    counts = steps + 1
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    line_idx = np.repeat(np.arange(len(counts)), counts)
+    i = np.arange(offsets[-1], dtype=np.int64) - offsets[:-1][line_idx]
+    div = np.maximum(steps, 1)[line_idx]  # steps == 0 has dx == dy == 0
+    if fixed_point:
+        xs = _round_half_even(x1[line_idx] * div + i * dx[line_idx], div)
+        ys = _round_half_even(y1[line_idx] * div + i * dy[line_idx], div)
+    else:
+        x_inc = dx / np.maximum(steps, 1); y_inc = dy / np.maximum(steps, 1)
+        xs = np.rint(x1[line_idx] + i * x_inc[line_idx]).astype(np.int64)
+        ys = np.rint(y1[line_idx] + i * y_inc[line_idx]).astype(np.int64)
+    return xs, ys, offsets
+
+def dda_batch_lines(endpoints, fixed_point=False):
+    """dda_batch split back into one list of (x, y) tuples per line."""
+    xs, ys, offsets = dda_batch(endpoints, fixed_point)
+    points = list(zip(xs.tolist(), ys.tolist()))
+    return [points[offsets[k]:offsets[k + 1]] for k in range(len(offsets) - 1)]
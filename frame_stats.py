@@ -0,0 +1,78 @@
+"""
+Frame timing
+
+Records per-panel draw times, frame times and event-to-present latency
+while enabled. dump() writes the recorded spans in the Chrome trace event
+format, which chrome://tracing and Perfetto open directly.
+"""
+
+import json
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class FrameStats:
+    def __init__(self, history=600, max_spans=100_000):
+        self.enabled = False
+        self.frames = deque(maxlen=history)   # (present time, frame seconds, latency seconds or None)
+        self.panel_times = {}                 # panel name -> seconds of its last draw
+        self.spans = deque(maxlen=max_spans)  # (name, start, seconds) for the trace
+        self.origin = time.perf_counter()
+
+    @contextmanager
+    def measure(self, name):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        yield
+        elapsed = time.perf_counter() - start
+        self.panel_times[name] = elapsed
+        self.spans.append((name, start, elapsed))
+
+    def frame(self, frame_start, event_time=None):
+        """
+        Record a presented frame. event_time is when its first input event
+        arrived, or None for a frame with no input behind it.
+        """
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        latency = now - event_time if event_time is not None else None
+        self.frames.append((now, now - frame_start, latency))
+        self.spans.append(("frame", frame_start, now - frame_start))
+        if latency is not None:
+            self.spans.append(("event to present", event_time, latency))
+
+    def fps(self):
+        """Frames presented during the last second."""
+        if not self.frames:
+            return 0
+        cutoff = self.frames[-1][0] - 1.0
+        return sum(1 for present, _, _ in self.frames if present >= cutoff)
+
+    def summary(self):
+        """Lines of text for the overlay."""
+        latencies = [latency for _, _, latency in self.frames if latency is not None][-60:]
+        text = [f"FPS: {self.fps()}"]
+        if self.frames:
+            text.append(f"Frame: {self.frames[-1][1] * 1000:.2f} ms")
+        if latencies:
+            text.append(f"Latency: {latencies[-1] * 1000:.2f} ms  (avg {sum(latencies) / len(latencies) * 1000:.2f}, max {max(latencies) * 1000:.2f})")
+        text += [f"{name}: {seconds * 1000:.2f} ms" for name, seconds in self.panel_times.items()]
+        return text
+
+    def dump(self, path):
+        events = [{"name": name, "ph": "X", "pid": 0, "tid": 0,
+                   "ts": (start - self.origin) * 1e6, "dur": seconds * 1e6} for name, start, seconds in self.spans]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def clear(self):
+        self.frames.clear()
+        self.panel_times.clear()
+        self.spans.clear()
+
+
+frame_stats = FrameStats()
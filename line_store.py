@@ -0,0 +1,198 @@
+"""
+Columnar line storage
+
+Lines live in parallel typed arrays: int32 endpoints and one byte holding
+the palette index with a DEAD flag in its top bit, 17 bytes per line. A
+line's id is its slot, so ids are stable and ascending ids are draw order.
+Deleted lines keep their slot so undo can bring them back. Live lines never
+carry the flag, so color[ids] of live ids is their palette index.
+
+Every mutation is recorded in a compact journal (op byte, int32 id), 5
+bytes per edit, that backs multi-level undo and redo. undo() / redo()
+return the change they applied as (kind, line_id) with kind "added",
+"removed" or "recolored".
+"""
+
+from array import array
+
+import numpy as np
+
+OP_APPEND, OP_DELETE, OP_COLOR = 0, 1, 0x80  # OP_COLOR ops carry old ^ new palette index in the low bits
+DEAD = 0x80         # Set in a deleted line's color byte
+COLOR_MASK = 0x7F   # Palette indices, so at most 128 colors
+
+
+class LineStore:
+    def __init__(self, palette, capacity=1024):
+        if len(palette) > COLOR_MASK + 1:
+            raise ValueError(f"a LineStore palette holds at most {COLOR_MASK + 1} colors")
+        self.palette = list(palette)
+        self.x1 = np.zeros(capacity, dtype=np.int32)
+        self.y1 = np.zeros(capacity, dtype=np.int32)
+        self.x2 = np.zeros(capacity, dtype=np.int32)
+        self.y2 = np.zeros(capacity, dtype=np.int32)
+        self.color = np.zeros(capacity, dtype=np.uint8)
+        self.count = 0      # Slots used, live or deleted
+        self.live = 0       # Live lines
+        self._live_ids = None  # Cached live ids once something was deleted
+        # Journal: op code and line id
+        self.ops = array("B")
+        self.op_ids = array("i")
+        self.undo_pos = 0   # Entries before this are applied, the rest can be redone
+
+    def __len__(self):
+        return self.live
+
+    @property
+    def capacity(self):
+        return len(self.x1)
+
+    def nbytes(self):
+        columns = (self.x1, self.y1, self.x2, self.y2, self.color)
+        journal = (self.ops, self.op_ids)
+        return sum(c.nbytes for c in columns) + sum(j.itemsize * len(j) for j in journal)
+
+    def _reserve(self, needed):
+        if needed <= self.capacity:
+            return
+        capacity = max(needed, 2 * self.capacity)
+        for name in ("x1", "y1", "x2", "y2", "color"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    # --- Reads ---
+    def get(self, line_id):
+        """(start, end, palette index) of a line."""
+        return ((int(self.x1[line_id]), int(self.y1[line_id])),
+                (int(self.x2[line_id]), int(self.y2[line_id])), int(self.color[line_id]) & COLOR_MASK)
+
+    def rgb(self, line_id):
+        return self.palette[self.color[line_id] & COLOR_MASK]
+
+    def is_alive(self, line_id):
+        return 0 <= line_id < self.count and not self.color[line_id] & DEAD
+
+    def ids(self):
+        """Live ids in draw order."""
+        if self.live == self.count:
+            return np.arange(self.count)
+        if self._live_ids is None:
+            self._live_ids = np.flatnonzero(self.color[:self.count] < DEAD)
+        return self._live_ids
+
+    def id_at(self, position):
+        """Id of the live line at draw-order position."""
+        return position if self.live == self.count else int(self.ids()[position])
+
+    def position_of(self, line_id):
+        return line_id if self.live == self.count else int(np.searchsorted(self.ids(), line_id))
+
+    def last_id(self):
+        return self.id_at(self.live - 1) if self.live else None
+
+    def ids_in_box(self, x0, y0, x1, y1):
+        """Live ids, in draw order, whose bounding box overlaps cells x0..x1, y0..y1."""
+        n = self.count
+        xa, ya, xb, yb = self.x1[:n], self.y1[:n], self.x2[:n], self.y2[:n]
+        mask = (self.color[:n] < DEAD) & (np.minimum(xa, xb) <= x1) & (np.maximum(xa, xb) >= x0) \
+            & (np.minimum(ya, yb) <= y1) & (np.maximum(ya, yb) >= y0)
+        return np.flatnonzero(mask)
+
+    def endpoints(self, ids=None):
+        """N x 4 int32 (x1, y1, x2, y2) array for dda_batch, live lines by default."""
+        ids = self.ids() if ids is None else ids
+        return np.stack([self.x1[ids], self.y1[ids], self.x2[ids], self.y2[ids]], axis=1)
+
+    # --- Journaled mutations ---
+    def _record(self, op, line_id):
+        del self.ops[self.undo_pos:], self.op_ids[self.undo_pos:]
+        self.ops.append(op)
+        self.op_ids.append(line_id)
+        self.undo_pos += 1
+
+    def _set_alive(self, line_id, alive):
+        self.color[line_id] = self.color[line_id] & COLOR_MASK if alive else self.color[line_id] | DEAD
+        self.live += 1 if alive else -1
+        self._live_ids = None
+
+    def append(self, start, end, color_index):
+        line_id = self.count
+        self._reserve(line_id + 1)
+        self.x1[line_id], self.y1[line_id] = start
+        self.x2[line_id], self.y2[line_id] = end
+        self.color[line_id] = color_index
+        self.count += 1
+        self.live += 1
+        self._live_ids = None
+        self._record(OP_APPEND, line_id)
+        return line_id
+
+    def extend(self, endpoints, colors):
+        """Bulk append without journaling, e.g. for loading a scene. Returns the first id."""
+        endpoints = np.asarray(endpoints).reshape(-1, 4)
+        first = self.count
+        end = first + len(endpoints)
+        self._reserve(end)
+        self.x1[first:end], self.y1[first:end] = endpoints[:, 0], endpoints[:, 1]
+        self.x2[first:end], self.y2[first:end] = endpoints[:, 2], endpoints[:, 3]
+        self.color[first:end] = colors
+        self.count = end
+        self.live += len(endpoints)
+        self._live_ids = None
+        return first
+
+    def delete(self, line_id):
+        self._set_alive(line_id, False)
+        self._record(OP_DELETE, line_id)
+
+    def set_color(self, line_id, color_index):
+        """Recolor a line; returns False, journaling nothing, when the color is unchanged."""
+        old = int(self.color[line_id])
+        if old == color_index:
+            return False
+        self.color[line_id] = color_index
+        self._record(OP_COLOR | old ^ color_index, line_id)
+        return True
+
+    def clear(self):
+        self.count = self.live = 0
+        self._live_ids = None
+        del self.ops[:], self.op_ids[:]
+        self.undo_pos = 0
+
+    # --- Undo / redo ---
+    def can_undo(self):
+        return self.undo_pos > 0
+
+    def can_redo(self):
+        return self.undo_pos < len(self.ops)
+
+    def undo(self):
+        if not self.can_undo():
+            return None
+        self.undo_pos -= 1
+        op, line_id = self.ops[self.undo_pos], self.op_ids[self.undo_pos]
+        if op == OP_APPEND:
+            self._set_alive(line_id, False)
+            return "removed", line_id
+        if op == OP_DELETE:
+            self._set_alive(line_id, True)
+            return "added", line_id
+        self.color[line_id] ^= op & COLOR_MASK
+        return "recolored", line_id
+
+    def redo(self):
+        if not self.can_redo():
+            return None
+        op, line_id = self.ops[self.undo_pos], self.op_ids[self.undo_pos]
+        self.undo_pos += 1
+        if op == OP_APPEND:
+            self._set_alive(line_id, True)
+            return "added", line_id
+        if op == OP_DELETE:
+            self._set_alive(line_id, False)
+            return "removed", line_id
+        self.color[line_id] ^= op & COLOR_MASK
+        return "recolored", line_id
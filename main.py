@@ -15,13 +15,29 @@ TO RUN:
 (in cmd, project directory)
 .\.venv\Scripts\activate
 python main.py
+python main.py --headless   (no window, SDL dummy video driver)
+python main.py scene.dda    (stream in a saved scene; Ctrl+S saves, Ctrl+O reloads, Ctrl+Shift+O drops unsaved edits)
+F3 shows frame timings, F4 writes them to frame_trace.json
 """
 
+import math
+import os
 import sys
+import time
+import numpy as np
 import pygame
+from dda import get_cell, dda_line_points, dda_batch, line_metrics
+from text_cache import text_cache
+from frame_stats import frame_stats
+from spatial_index import CellIndex
+from line_store import LineStore
+from tiles import TileCanvas, TILE_SHIFT, TILE_SIZE, MIXED_CELL, downsample
+from scene_file import open_scene, save_store, full_palette
+import raster_pool
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
 
 # --- Setup and Global Settings ---
-pygame.init()
 WINDOW_WIDTH, WINDOW_HEIGHT = 1400, 700
 LEFT_PANEL_WIDTH = 600
 STATUS_PANEL_HEIGHT = 50
@@ -29,7 +45,25 @@ CONTROL_PANEL_HEIGHT = 50
 COLOR_PANEL_HEIGHT = 150
 TABLE_PANEL_HEIGHT = WINDOW_HEIGHT - (STATUS_PANEL_HEIGHT + CONTROL_PANEL_HEIGHT + COLOR_PANEL_HEIGHT)
 RIGHT_PANEL_WIDTH = WINDOW_WIDTH - LEFT_PANEL_WIDTH
-CELL_SIZE = 20
+CELL_SIZE = 20  # Cell size in pixels at the closest zoom
+ZOOM_LEVELS = [1 / 16, 1 / 8, 1 / 4, 1 / 2, 1, 2, 4, 8, 12, 16, 20]  # Below 1 a pixel shows several cells
+MIN_GRID_LINE_CELL = 4  # Smallest cell size that still gets grid lines
+EMPTY_CELL_KEY = (1, 2, 3)  # Colorkey for empty tile cells, not a palette color
+MIXED_CELL_COLOR = (128, 128, 128)  # Zoomed-out blocks covering lines of different colors
+PAN_KEYS = {pygame.K_LEFT: (1, 0), pygame.K_RIGHT: (-1, 0), pygame.K_UP: (0, 1), pygame.K_DOWN: (0, -1)}
+TABLE_HEADER_HEIGHT = 45  # Header labels plus the rule below them
+TABLE_ROW_HEIGHT = 30
+TABLE_COLUMNS = ["L # ", "A", "B", "dx", "dy", "St", "x_i", "y_i", "Color", "Delete"]
+SCROLLBAR_WIDTH = 14
+TOOLS = ["Draw", "Erase", "Pick"]
+SELECTION_COLOR = (255, 200, 0)
+ROW_CACHE_SIZE = 256
+SCENE_FILE = "scene.dda"  # Default path for Ctrl+S / Ctrl+O
+TRACE_FILE = "frame_trace.json"  # F4 dumps the frame timings here
+PROFILE_OVERLAY_SIZE = (330, 190)  # F3 toggles it in the top-right corner of the grid
+SCENE_CHUNK_SECONDS = 0.03  # Time a streaming scene load may take per frame
+RASTER_WORKERS = raster_pool.default_workers()  # Processes for full rebuilds of large scenes
+scene_pool = ThreadPoolExecutor(1)  # Waits on raster_pool for scene loads so the event loop keeps running
 
 WHITE = (255, 255, 255)
 LIGHT_GRAY = (200, 200, 200)
@@ -48,28 +82,86 @@ color_options = [
     {"name": "Orange", "color": (255, 165, 0)}
 ]
 
-screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
-pygame.display.set_caption("DDA Line Generator")
-clock = pygame.time.Clock()
+screen = None  # Display surface, created by init_display()
+clock = None
+layout = {}    # Panel rects and color swatches for the current window size, see compute_layout()
 
-lines = []      # Finalized lines
+lines = LineStore([option["color"] for option in color_options])  # Finalized lines
 point_a = None  # Starting point for current line
 hover_cell = None  # Current hovered grid cell
 continuous_mode = False  # Continuous drawing toggle
+active_tool = "Draw"     # What a click on the grid does
+selected_line_id = None  # Line highlighted by the Pick tool or a table click
 control_toggle_rect = None
+control_tool_rect = None
 control_undo_rect = None
+control_redo_rect = None
+cell_index = CellIndex(lambda tx, ty: index_tile_lines(tx, ty), TILE_SHIFT)  # cell -> ids of the lines covering it
+canvas = TileCanvas()     # Occupancy and color bitmaps of every line, tile by tile
+tile_palette = np.zeros((256, 3), dtype=np.uint8)  # Tile cell value -> RGB
+tile_palette[:len(color_options) + 1] = [EMPTY_CELL_KEY] + [option["color"] for option in color_options]
+tile_palette[MIXED_CELL] = MIXED_CELL_COLOR
+
+# --- Table State ---
+table_scroll = 0            # Display index of the top visible row (0 = newest line)
+table_track_rect = None     # Scrollbar track, None when everything fits
+table_thumb_rect = None
+table_drag_offset = None    # Mouse offset inside the thumb while dragging
+row_cache = OrderedDict()   # line id -> rendered row surface, LRU
+goto_buffer = ""            # Digits typed for "jump to line"
+
+# --- Retained Rendering State ---
+cell_size = CELL_SIZE   # Current zoom, one of ZOOM_LEVELS
+view_offset = [0, 0]    # Layer pixel position of cell (0, 0)
+tile_surfaces = {}      # tile key -> ((version, scale), surface)
+grid_background = None  # Grid panel for the current view: white fill, border, watermark and grid lines
+line_layer = None       # grid_background with the visible tiles composited on top
+grid_dirty_rects = []   # Layer-local areas changed since the last present
+overlay_rect = None     # Layer-local area covered by the preview line and hover outline
+overlay_state = None    # Inputs the overlay was last drawn for
+panels_dirty = True     # Left-hand panels need to be redrawn
+
+# Scene files
+scene_path = SCENE_FILE
+scene_loader = None     # Generator ingesting a scene one chunk per frame, None when idle
+scene_progress = (0, 0)  # (lines loaded, lines in the file) of the current load
+unsaved_changes = False  # Edits since the last save or load
+status_message = None    # One-off notice for the status panel, cleared by the next click or key
 
 # --- Utility Functions ---
-def get_cell(pos, grid_rect, cell_size):
-    x, y = pos
-    return ((x - grid_rect.x) // cell_size, (y - grid_rect.y) // cell_size) if grid_rect.collidepoint(pos) else None
+def init_display(headless=False):
+    """Open the window; headless uses SDL's dummy driver so no display is needed."""
+    global screen, clock
+    if headless:
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+    pygame.init()
+    screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    pygame.display.set_caption("DDA Line Generator")
+    clock = pygame.time.Clock()
+    compute_layout(screen.get_size())
+    return screen
 
-def dda_line_points(pointA, pointB):
-    x1, y1 = pointA; x2, y2 = pointB
-    dx = x2 - x1; dy = y2 - y1; steps = max(abs(dx), abs(dy))
-    if steps == 0: return [pointA]
-    x_inc = dx / steps; y_inc = dy / steps
-    return [(int(round(x1 + i * x_inc)), int(round(y1 + i * y_inc))) for i in range(steps + 1)]
+def compute_layout(size):
+    """Panel rects and swatches, worked out once per window size."""
+    if layout.get("size") == size:
+        return layout
+    width, height = size
+    top = STATUS_PANEL_HEIGHT + CONTROL_PANEL_HEIGHT
+    layout.update(
+        size=size,
+        left=pygame.Rect(0, 0, LEFT_PANEL_WIDTH, height),
+        status=pygame.Rect(0, 0, LEFT_PANEL_WIDTH, STATUS_PANEL_HEIGHT),
+        control=pygame.Rect(0, STATUS_PANEL_HEIGHT, LEFT_PANEL_WIDTH, CONTROL_PANEL_HEIGHT),
+        color=pygame.Rect(0, top, LEFT_PANEL_WIDTH, COLOR_PANEL_HEIGHT),
+        table=pygame.Rect(0, top + COLOR_PANEL_HEIGHT, LEFT_PANEL_WIDTH, height - top - COLOR_PANEL_HEIGHT),
+        grid=pygame.Rect(LEFT_PANEL_WIDTH, 0, width - LEFT_PANEL_WIDTH, height),
+    )
+    layout["swatches"] = get_color_swatches(layout["color"])
+    layout["profile"] = pygame.Rect(layout["grid"].width - PROFILE_OVERLAY_SIZE[0] - 10, 10, *PROFILE_OVERLAY_SIZE)  # Grid-local
+    return layout
+
+def color_options_index(color):
+    return next(idx for idx, option in enumerate(color_options) if option["color"] == color)
 
 def get_color_swatches(panel_rect):
     swatch_size, gap, num_cols, num_rows = 40, 10, 4, 2
@@ -90,199 +182,804 @@ def get_color_swatches(panel_rect):
 def draw_status_panel(surface, rect):
     pygame.draw.rect(surface, LIGHT_GRAY, rect)
     pygame.draw.rect(surface, BLACK, rect, 2)
-    font = pygame.font.SysFont(None, 24)
-    if point_a is None:
+    if status_message:
+        status_text = status_message
+    elif scene_loader is not None:
+        status_text = f"Loading {scene_path}: {scene_progress[0]} / {scene_progress[1]} lines"
+    elif goto_buffer:
+        status_text = f"Go to line: {goto_buffer}_   (Enter to jump, Esc to cancel)"
+    elif point_a is None:
         status_text = f"Cursor: {hover_cell}" if hover_cell is not None else "Cursor: -"
     else:
         status_text = f"Point A: {point_a}"
         if hover_cell is not None:
-            dx = hover_cell[0] - point_a[0]; dy = hover_cell[1] - point_a[1]
-            steps = max(abs(dx), abs(dy))
-            if steps:
-                x_inc = dx / steps; y_inc = dy / steps
-            else:
-                x_inc = y_inc = 0
+            dx, dy, steps, x_inc, y_inc = line_metrics(point_a, hover_cell)
             status_text += f"  |  Point B: {hover_cell} | dx: {dx}, dy: {dy}, St: {steps}, x_i: {x_inc:.2f}, y_i: {y_inc:.2f}"
         else:
             status_text += "  |  Waiting for Point B..."
-    surface.blit(font.render(status_text, True, BLACK), (rect.x + 10, rect.y + 5))
+    surface.blit(text_cache.render(status_text, 24, BLACK), (rect.x + 10, rect.y + 5))
 
 def draw_control_panel(surface, rect):
-    global control_toggle_rect, control_undo_rect
+    global control_toggle_rect, control_tool_rect, control_undo_rect, control_redo_rect
     pygame.draw.rect(surface, LIGHT_GRAY, rect)
     pygame.draw.rect(surface, BLACK, rect, 2)
-    font = pygame.font.SysFont(None, 24)
-    half_width = rect.width // 2
-    toggle_rect = pygame.Rect(rect.x + 10, rect.y + 5, half_width - 20, rect.height - 10)
-    undo_rect = pygame.Rect(rect.x + half_width + 10, rect.y + 5, half_width - 20, rect.height - 10)
+    third_width = rect.width // 3
+    toggle_rect = pygame.Rect(rect.x + 10, rect.y + 5, third_width - 20, rect.height - 10)
+    tool_rect = pygame.Rect(rect.x + third_width + 10, rect.y + 5, third_width - 20, rect.height - 10)
+    undo_rect = pygame.Rect(rect.x + 2 * third_width + 10, rect.y + 5, third_width // 2 - 15, rect.height - 10)
+    redo_rect = pygame.Rect(undo_rect.right + 10, rect.y + 5, third_width // 2 - 15, rect.height - 10)
     toggle_text = "Continuous: ON" if continuous_mode else "Continuous: OFF"
     toggle_color = (100, 255, 100) if continuous_mode else (255, 100, 100)
     pygame.draw.rect(surface, toggle_color, toggle_rect)
     pygame.draw.rect(surface, BLACK, toggle_rect, 2)
-    surface.blit(font.render(toggle_text, True, BLACK), (toggle_rect.x + 5, toggle_rect.y + 5))
+    surface.blit(text_cache.render(toggle_text, 24, BLACK, pin=True), (toggle_rect.x + 5, toggle_rect.y + 5))
     control_toggle_rect = toggle_rect
+    pygame.draw.rect(surface, (255, 230, 160), tool_rect)
+    pygame.draw.rect(surface, BLACK, tool_rect, 2)
+    surface.blit(text_cache.render(f"Tool: {active_tool}", 24, BLACK, pin=True), (tool_rect.x + 5, tool_rect.y + 5))
+    control_tool_rect = tool_rect
     pygame.draw.rect(surface, (200, 200, 255), undo_rect)
     pygame.draw.rect(surface, BLACK, undo_rect, 2)
-    surface.blit(font.render("Undo", True, BLACK), (undo_rect.x + 15, undo_rect.y + 5))
+    surface.blit(text_cache.render("Undo", 24, BLACK, pin=True), (undo_rect.x + 15, undo_rect.y + 5))
     control_undo_rect = undo_rect
+    pygame.draw.rect(surface, (200, 200, 255), redo_rect)
+    pygame.draw.rect(surface, BLACK, redo_rect, 2)
+    surface.blit(text_cache.render("Redo", 24, BLACK, pin=True), (redo_rect.x + 15, redo_rect.y + 5))
+    control_redo_rect = redo_rect
 
 def draw_color_panel(surface, rect):
     pygame.draw.rect(surface, LIGHT_GRAY, rect)
     pygame.draw.rect(surface, BLACK, rect, 2)
-    for swatch in get_color_swatches(rect):
+    for swatch in layout["swatches"]:
         pygame.draw.rect(surface, swatch["color"], swatch["rect"])
         border = 3 if swatch["color"] == DEFAULT_LINE_COLOR else 1
         pygame.draw.rect(surface, WHITE if swatch["color"] == DEFAULT_LINE_COLOR else BLACK, swatch["rect"], border)
 
+def table_geometry(rect):
+    effective_width = int(0.9 * rect.width)
+    col_width = effective_width // len(TABLE_COLUMNS)
+    left_margin = rect.x + (rect.width - effective_width) // 2
+    body_rect = pygame.Rect(rect.x + 2, rect.y + TABLE_HEADER_HEIGHT, rect.width - 4, rect.height - TABLE_HEADER_HEIGHT - 2)
+    return col_width, left_margin, body_rect
+
+def table_page_rows(rect):
+    return table_geometry(rect)[2].height // TABLE_ROW_HEIGHT
+
+def clamp_table_scroll(rect):
+    global table_scroll
+    table_scroll = max(0, min(table_scroll, len(lines) - table_page_rows(rect)))
+
+def render_table_row(line_id, col_width):
+    """Row surface for one line, every column except the L # that shifts as lines are added."""
+    surface = row_cache.get(line_id)
+    if surface is not None:
+        row_cache.move_to_end(line_id)
+        return surface
+    surface = pygame.Surface((len(TABLE_COLUMNS) * col_width, TABLE_ROW_HEIGHT))
+    surface.fill(LIGHT_GRAY)
+    a, b, _ = lines.get(line_id)
+    dx, dy, steps, x_inc, y_inc = line_metrics(a, b)
+    row_values = [f"({a[0]},{a[1]})", f"({b[0]},{b[1]})", str(dx), str(dy), str(steps), f"{x_inc:.2f}", f"{y_inc:.2f}"]
+    for i, value in enumerate(row_values, start=1):
+        surface.blit(text_cache.render(value, 24, BLACK), (i * col_width, 0))
+    color_rect = pygame.Rect(8 * col_width + 5, 3, col_width - 10, TABLE_ROW_HEIGHT - 6)
+    pygame.draw.rect(surface, lines.rgb(line_id), color_rect)
+    pygame.draw.rect(surface, BLACK, color_rect, 1)
+    delete_rect = pygame.Rect(9 * col_width + 5, 3, col_width - 10, TABLE_ROW_HEIGHT - 6)
+    pygame.draw.rect(surface, (255, 0, 0), delete_rect)
+    pygame.draw.rect(surface, BLACK, delete_rect, 1)
+    surface.blit(text_cache.render("X", 24, WHITE, pin=True), (delete_rect.x + 10, delete_rect.y + 3))
+    row_cache[line_id] = surface
+    if len(row_cache) > ROW_CACHE_SIZE:
+        row_cache.popitem(last=False)
+    return surface
+
 def draw_table_panel(surface, rect):
+    global table_track_rect, table_thumb_rect
     pygame.draw.rect(surface, LIGHT_GRAY, rect)
     pygame.draw.rect(surface, BLACK, rect, 2)
-    font = pygame.font.SysFont(None, 24)
-    col_headers = ["L # ", "A", "B", "dx", "dy", "St", "x_i", "y_i", "Color", "Delete"]
-    num_cols = len(col_headers)
-    effective_width = int(0.9 * rect.width)
-    col_width = effective_width // num_cols
-    left_margin = rect.x + (rect.width - effective_width) // 2
+    col_width, left_margin, body_rect = table_geometry(rect)
     header_y = rect.y + 10
-    for i, header in enumerate(col_headers):
+    for i, header in enumerate(TABLE_COLUMNS):
         cell_x = left_margin + i * col_width
-        surface.blit(font.render(header, True, BLACK), (cell_x, header_y))
+        surface.blit(text_cache.render(header, 24, BLACK, pin=True), (cell_x, header_y))
     header_bottom_y = header_y + 30
     pygame.draw.line(surface, BLACK, (rect.x, header_bottom_y), (rect.x + rect.width, header_bottom_y), 2)
-    row_y = header_bottom_y + 5
-    row_height = 30
-    # --- Display lines sorted from latest (top) to oldest ---
-    for idx, line in enumerate(reversed(lines)):
-        a = line["start"]
-        b = line["end"]
-        dx = b[0] - a[0]
-        dy = b[1] - a[1]
-        steps = max(abs(dx), abs(dy))
-        x_inc = dx / steps if steps else 0
-        y_inc = dy / steps if steps else 0
-        row_values = [str(idx + 1), f"({a[0]},{a[1]})", f"({b[0]},{b[1]})", str(dx), str(dy), str(steps), f"{x_inc:.2f}", f"{y_inc:.2f}"]
-        for i, value in enumerate(row_values):
-            cell_x = left_margin + i * col_width
-            surface.blit(font.render(value, True, BLACK), (cell_x, row_y))
-        cell_x = left_margin + 8 * col_width
-        color_rect = pygame.Rect(cell_x + 5, row_y + 3, col_width - 10, row_height - 6)
-        pygame.draw.rect(surface, line["color"], color_rect)
-        pygame.draw.rect(surface, BLACK, color_rect, 1)
-        cell_x = left_margin + 9 * col_width
-        delete_rect = pygame.Rect(cell_x + 5, row_y + 3, col_width - 10, row_height - 6)
-        pygame.draw.rect(surface, (255, 0, 0), delete_rect)
-        pygame.draw.rect(surface, BLACK, delete_rect, 1)
-        surface.blit(font.render("X", True, WHITE), (delete_rect.x + 10, delete_rect.y + 3))
-        line["delete_rect"] = delete_rect
-        row_y += row_height
+    # --- Display only the visible window of lines, latest (top) to oldest ---
+    clamp_table_scroll(rect)
+    previous_clip = surface.get_clip()
+    surface.set_clip(body_rect.clip(previous_clip))
+    row_y = body_rect.y
+    idx = table_scroll
+    while idx < len(lines) and row_y < body_rect.bottom:
+        line_id = lines.id_at(len(lines) - 1 - idx)
+        surface.blit(render_table_row(line_id, col_width), (left_margin, row_y))
+        surface.blit(text_cache.render(str(idx + 1), 24, BLACK), (left_margin, row_y))
+        if line_id == selected_line_id:
+            pygame.draw.rect(surface, SELECTION_COLOR, (left_margin - 4, row_y, len(TABLE_COLUMNS) * col_width + 4, TABLE_ROW_HEIGHT), 2)
+        row_y += TABLE_ROW_HEIGHT
+        idx += 1
+    surface.set_clip(previous_clip)
+    # --- Scrollbar, only when the rows overflow the panel ---
+    page_rows = table_page_rows(rect)
+    if len(lines) > page_rows:
+        track = pygame.Rect(rect.right - SCROLLBAR_WIDTH - 6, body_rect.y + 2, SCROLLBAR_WIDTH, body_rect.height - 4)
+        thumb_height = max(20, track.height * page_rows // len(lines))
+        max_scroll = len(lines) - page_rows
+        thumb_y = track.y + (track.height - thumb_height) * table_scroll // max_scroll
+        thumb = pygame.Rect(track.x, thumb_y, SCROLLBAR_WIDTH, thumb_height)
+        pygame.draw.rect(surface, WHITE, track)
+        pygame.draw.rect(surface, DARK_GRAY, thumb)
+        pygame.draw.rect(surface, BLACK, track, 1)
+        table_track_rect, table_thumb_rect = track, thumb
+    else:
+        table_track_rect = table_thumb_rect = None
 
-def draw_grid_panel(surface, rect):
+def table_hit(pos, rect):
+    """(line id, on_delete) for the table row under pos, found from its row index."""
+    col_width, left_margin, body_rect = table_geometry(rect)
+    if not body_rect.collidepoint(pos):
+        return None, False
+    row_y = (pos[1] - body_rect.y) // TABLE_ROW_HEIGHT
+    idx = table_scroll + row_y
+    if idx >= len(lines):
+        return None, False
+    delete_rect = pygame.Rect(left_margin + 9 * col_width + 5, body_rect.y + row_y * TABLE_ROW_HEIGHT + 3,
+                              col_width - 10, TABLE_ROW_HEIGHT - 6)
+    return lines.id_at(len(lines) - 1 - idx), delete_rect.collidepoint(pos)
+
+def scroll_table_to_thumb(mouse_y, rect):
+    """Set the scroll position from the top edge of a dragged scrollbar thumb."""
+    global table_scroll
+    travel = table_track_rect.height - table_thumb_rect.height
+    max_scroll = len(lines) - table_page_rows(rect)
+    if travel > 0:
+        fraction = (mouse_y - table_drag_offset - table_track_rect.y) / travel
+        table_scroll = round(fraction * max_scroll)
+    clamp_table_scroll(rect)
+
+def table_number(line_id):
+    """The L # shown for a live line: 1 is the newest."""
+    return len(lines) - lines.position_of(line_id)
+
+def jump_to_line(number, rect):
+    """Scroll so that table row `number` (the L # column) is at the top."""
+    global table_scroll
+    table_scroll = number - 1
+    clamp_table_scroll(rect)
+
+def build_grid_background(size):
+    """White panel, border, watermark and, when cells are big enough to see, grid lines for the current view."""
+    surface = pygame.Surface(size)
+    rect = surface.get_rect()
     pygame.draw.rect(surface, WHITE, rect)
     pygame.draw.rect(surface, BLACK, rect, 2)
     
     # --- Draw watermark of names --- 
-    font = pygame.font.SysFont(None, 48)
     names = ["Rynz Daval", "Mikhaina Tiu", "Danice Arroyo"]  # <-- group member names
     watermark_text = " | ".join(names)
-    text_surface = font.render(watermark_text, True, (100, 100, 100))  # darker gray
-    text_surface.set_alpha(180)  # less transparent, more visible
+    # darker gray, alpha 180: less transparent, more visible
+    text_surface = text_cache.render(watermark_text, 48, (100, 100, 100), alpha=180, pin=True)
     text_rect = text_surface.get_rect(center=(rect.x + rect.width // 2, rect.y + rect.height // 2))
     surface.blit(text_surface, text_rect)
 
-    
-    cols = rect.width // CELL_SIZE
-    rows = rect.height // CELL_SIZE
-    for col in range(cols + 1):
-        pygame.draw.line(surface, LIGHT_GRAY, (rect.x + col * CELL_SIZE, rect.y),
-                         (rect.x + col * CELL_SIZE, rect.y + rect.height))
-    for row in range(rows + 1):
-        pygame.draw.line(surface, LIGHT_GRAY, (rect.x, rect.y + row * CELL_SIZE),
-                         (rect.x + rect.width, rect.y + row * CELL_SIZE))
-    for line in lines:
-        for pt in dda_line_points(line["start"], line["end"]):
-            pygame.draw.rect(surface, line["color"],
-                             pygame.Rect(rect.x + pt[0] * CELL_SIZE, rect.y + pt[1] * CELL_SIZE, CELL_SIZE, CELL_SIZE))
+    if cell_size >= MIN_GRID_LINE_CELL:
+        first_col = -(view_offset[0] // cell_size)
+        first_row = -(view_offset[1] // cell_size)
+        cols = rect.width // cell_size + 1
+        rows = rect.height // cell_size + 1
+        for col in range(first_col, first_col + cols + 1):
+            x = view_offset[0] + col * cell_size
+            pygame.draw.line(surface, LIGHT_GRAY, (rect.x + x, rect.y), (rect.x + x, rect.y + rect.height))
+        for row in range(first_row, first_row + rows + 1):
+            y = view_offset[1] + row * cell_size
+            pygame.draw.line(surface, LIGHT_GRAY, (rect.x, rect.y + y), (rect.x + rect.width, rect.y + y))
+    return surface
+
+def cell_span_rect(x0, y0, x1, y1):
+    """Layer pixel rect covering cells x0..x1, y0..y1 at the current view, clipped to the layer."""
+    left = view_offset[0] + math.floor(x0 * cell_size)
+    top = view_offset[1] + math.floor(y0 * cell_size)
+    right = max(left + 1, view_offset[0] + math.floor((x1 + 1) * cell_size))
+    bottom = max(top + 1, view_offset[1] + math.floor((y1 + 1) * cell_size))
+    left, top = max(left, 0), max(top, 0)
+    right, bottom = min(right, line_layer.get_width()), min(bottom, line_layer.get_height())
+    return pygame.Rect(left, top, max(0, right - left), max(0, bottom - top))
+
+def cell_rect(cell):
+    return cell_span_rect(cell[0], cell[1], cell[0], cell[1])
+
+def line_bounds(pointA, pointB):
+    # DDA never leaves the bounding box of its endpoints
+    return cell_span_rect(min(pointA[0], pointB[0]), min(pointA[1], pointB[1]),
+                          max(pointA[0], pointB[0]), max(pointA[1], pointB[1]))
+
+def visible_cells(region):
+    """Inclusive cell range (x0, y0, x1, y1) shown inside a layer pixel region."""
+    x0 = math.floor((region.left - view_offset[0]) / cell_size)
+    y0 = math.floor((region.top - view_offset[1]) / cell_size)
+    x1 = math.floor((region.right - 1 - view_offset[0]) / cell_size)
+    y1 = math.floor((region.bottom - 1 - view_offset[1]) / cell_size)
+    return x0, y0, x1, y1
+
+def tile_surface(key):
+    """Surface for one tile at the current zoom, rebuilt only when the tile or the zoom changed."""
+    tile = canvas.get(key)
+    scale = min(cell_size, 1)
+    cached = tile_surfaces.get(key)
+    if cached and cached[0] == (tile.version, scale):
+        return cached[1]
+    cells = downsample(tile.cells, round(1 / scale))
+    rgb = tile_palette[cells]
+    surface = pygame.surfarray.make_surface(rgb.swapaxes(0, 1))
+    surface.set_colorkey(EMPTY_CELL_KEY)
+    tile_surfaces[key] = ((tile.version, scale), surface)
+    return surface
+
+def compose_region(region):
+    """Repaint one area of the line layer from the background and the tiles under it."""
+    region = region.clip(line_layer.get_rect())
+    if not region.width or not region.height:
+        return
+    line_layer.blit(grid_background, region, region)
+    line_layer.set_clip(region)
+    x0, y0, x1, y1 = visible_cells(region)
+    for key in canvas.keys_in(x0, y0, x1, y1):
+        tx, ty = key[0] * TILE_SIZE, key[1] * TILE_SIZE
+        surface = tile_surface(key)
+        if cell_size < 1:
+            line_layer.blit(surface, (view_offset[0] + math.floor(tx * cell_size), view_offset[1] + math.floor(ty * cell_size)))
+            continue
+        # Scale only the part of the tile inside the region
+        cx0, cy0 = max(x0, tx), max(y0, ty)
+        cx1, cy1 = min(x1, tx + TILE_SIZE - 1), min(y1, ty + TILE_SIZE - 1)
+        source = pygame.Rect(cx0 - tx, cy0 - ty, cx1 - cx0 + 1, cy1 - cy0 + 1)
+        scaled = pygame.transform.scale(surface.subsurface(source), (source.width * cell_size, source.height * cell_size))
+        scaled.set_colorkey(EMPTY_CELL_KEY)
+        line_layer.blit(scaled, (view_offset[0] + cx0 * cell_size, view_offset[1] + cy0 * cell_size))
+    line_layer.set_clip(None)
+    grid_dirty_rects.append(region)
+
+def compose_view():
+    """Rebuild the whole visible layer, e.g. after a pan or zoom."""
+    global grid_background, grid_dirty_rects
+    grid_background = build_grid_background(line_layer.get_size())
+    grid_dirty_rects = []
+    compose_region(line_layer.get_rect())
+
+def rebuild_line_layer(grid_rect):
+    """Rebuild the tiles and the cached layer from `lines`; the cell index reloads lazily."""
+    global line_layer
+    line_layer = pygame.Surface(grid_rect.size)
+    canvas.clear()
+    tile_surfaces.clear()
+    cell_index.clear()
+    ids = lines.ids()
+    endpoints, colors = lines.endpoints(ids), lines.color[ids]
+    if len(ids) and not paint_pooled(endpoints, colors, endpoint_bounds(endpoints)):
+        canvas.rasterize(endpoints, colors)
+    compose_view()
+
+def endpoint_bounds(endpoints):
+    return (int(endpoints[:, 0::2].min()), int(endpoints[:, 1::2].min()),
+            int(endpoints[:, 0::2].max()), int(endpoints[:, 1::2].max()))
+
+def pool_fits(count, box):
+    """Whether `count` lines over the inclusive cell box should go through the process pool."""
+    x0, y0, x1, y1 = box
+    return RASTER_WORKERS > 1 and count >= raster_pool.MIN_PARALLEL_LINES \
+        and (x1 - x0 + 1) * (y1 - y0 + 1) <= raster_pool.MAX_IMAGE_CELLS
+
+def paint_pooled(endpoints, colors, box):
+    """
+    Paint a large batch of lines on top of the canvas through the process
+    pool. Returns False, painting nothing, when it should stay on one core.
+    """
+    if not pool_fits(len(endpoints), box):
+        return False
+    canvas.blit(raster_pool.rasterize(endpoints, colors, box, RASTER_WORKERS), box[:2])
+    return True
+
+def index_tile_lines(tx, ty):
+    """Cells of the live lines crossing one tile, loaded into cell_index on first use."""
+    x0, y0 = tx * TILE_SIZE, ty * TILE_SIZE
+    x1, y1 = x0 + TILE_SIZE - 1, y0 + TILE_SIZE - 1
+    ids = lines.ids_in_box(x0, y0, x1, y1)
+    xs, ys, offsets = dda_batch(lines.endpoints(ids))
+    owners = np.repeat(ids, np.diff(offsets))
+    inside = (xs >= x0) & (xs <= x1) & (ys >= y0) & (ys <= y1)
+    return xs[inside], ys[inside], owners[inside]
+
+def refresh_cells(points):
+    """Set each cell's tile value from the topmost live line the index has for it."""
+    values = []
+    for cell in points:
+        line_id = cell_index.topmost(cell)
+        values.append(0 if line_id is None else int(lines.color[line_id]) + 1)
+    canvas.set_cells(points, values)
+
+def line_added(line_id):
+    """Bring the tiles, index, layer and table up to date with a line that became live."""
+    global panels_dirty, table_scroll, unsaved_changes
+    unsaved_changes = True
+    start, end, color = lines.get(line_id)
+    points = dda_line_points(start, end)
+    cell_index.add(line_id, points)
+    if len(lines) - 1 - lines.position_of(line_id) < table_scroll:
+        table_scroll += 1  # Keep the same rows in view while scrolled down
+    if line_id == lines.last_id():
+        canvas.set_cells(points, [color + 1] * len(points))  # Newest line is on top
+    else:
+        refresh_cells(points)  # Restored under later lines
+    compose_region(line_bounds(start, end))
+    panels_dirty = True
+
+def line_removed(line_id):
+    global panels_dirty, table_scroll, selected_line_id, unsaved_changes
+    unsaved_changes = True
+    start, end, _ = lines.get(line_id)
+    points = dda_line_points(start, end)
+    cell_index.remove(line_id, points)
+    refresh_cells(points)
+    if selected_line_id == line_id:
+        selected_line_id = None
+    if len(lines) - lines.position_of(line_id) < table_scroll:
+        table_scroll -= 1  # A row above the visible window went away
+    row_cache.pop(line_id, None)
+    compose_region(line_bounds(start, end))
+    panels_dirty = True
+
+def line_recolored(line_id):
+    global panels_dirty, unsaved_changes
+    unsaved_changes = True
+    start, end, _ = lines.get(line_id)
+    refresh_cells(dda_line_points(start, end))
+    row_cache.pop(line_id, None)
+    compose_region(line_bounds(start, end))
+    panels_dirty = True
+
+def apply_change(change):
+    """Reflect a (kind, line id) change from LineStore.undo() / redo() on screen."""
+    if change is None:
+        return
+    kind, line_id = change
+    {"added": line_added, "removed": line_removed, "recolored": line_recolored}[kind](line_id)
+
+def add_line(start, end, color):
+    finish_scene_load()
+    line_id = lines.append(start, end, color_options_index(color))
+    line_added(line_id)
+    return line_id
+
+def remove_line(line_id):
+    finish_scene_load()
+    lines.delete(line_id)
+    line_removed(line_id)
+
+def recolor_line(line_id, color):
+    finish_scene_load()
+    if lines.set_color(line_id, color_options_index(color)):
+        line_recolored(line_id)
+
+def undo():
+    finish_scene_load()
+    apply_change(lines.undo())
+
+def redo():
+    finish_scene_load()
+    apply_change(lines.redo())
+
+def pan_view(dx, dy):
+    view_offset[0] += dx
+    view_offset[1] += dy
+    compose_view()
+
+def zoom_view(steps, anchor):
+    """Zoom by `steps` levels keeping the cell under the layer-local anchor point in place."""
+    global cell_size
+    level = max(0, min(ZOOM_LEVELS.index(cell_size) + steps, len(ZOOM_LEVELS) - 1))
+    new_size = ZOOM_LEVELS[level]
+    if new_size == cell_size:
+        return
+    world_x = (anchor[0] - view_offset[0]) / cell_size
+    world_y = (anchor[1] - view_offset[1]) / cell_size
+    cell_size = new_size
+    view_offset[0] = round(anchor[0] - world_x * cell_size)
+    view_offset[1] = round(anchor[1] - world_y * cell_size)
+    compose_view()
+
+def reset_view():
+    global cell_size
+    cell_size = CELL_SIZE
+    view_offset[:] = [0, 0]
+    compose_view()
+
+# --- Scene Files ---
+def save_scene_file(path):
+    global unsaved_changes
+    finish_scene_load()
+    save_store(path, lines)
+    unsaved_changes = False
+
+def load_scene_file(path):
+    """Replace the current lines with a scene file, streamed in by ingest_scene_chunk()."""
+    global scene_loader, scene_path, selected_line_id, point_a, table_scroll, panels_dirty, unsaved_changes
+    scene = open_scene(path)
+    lines.clear()
+    canvas.clear()
+    tile_surfaces.clear()
+    cell_index.clear()
+    row_cache.clear()
+    selected_line_id = point_a = None
+    table_scroll = 0
+    scene_path = path
+    unsaved_changes = False
+    scene_loader = stream_scene(scene)
+    compose_view()
+    panels_dirty = True
+
+def open_scene_file(path):
+    """load_scene_file, reporting a file that cannot be read in the status panel instead of raising."""
+    global status_message, panels_dirty
+    try:
+        load_scene_file(path)
+    except (OSError, ValueError) as error:
+        status_message = f"Could not open scene: {error}"
+        panels_dirty = True
+
+def scene_palette_map(palette):
+    """
+    Palette index in a scene file -> index into color_options, nearest color
+    when not exact. Covers all 256 indices, so a record past the end of the
+    file's palette still maps to a color.
+    """
+    options = np.array([option["color"] for option in color_options], dtype=np.int32)
+    return np.array([int(((options - color) ** 2).sum(axis=1).argmin()) for color in full_palette(palette)], dtype=np.uint8)
+
+def rasterize_scene(scene, palette_map):
+    """
+    Runs on scene_pool: (cell image, top-left cell) of the whole scene, or
+    None when its bounding box is too large for one shared image.
+    """
+    box = scene.bounds()
+    if not pool_fits(len(scene), box):
+        return None
+    return raster_pool.rasterize(scene.endpoints(), palette_map[scene.colors()], box, RASTER_WORKERS), box[:2]
+
+def stream_scene(scene):
+    """
+    Append the scene's lines chunk by chunk, painting each chunk over the
+    last. Chunk sizes adapt so each step takes about SCENE_CHUNK_SECONDS.
+    A large scene is rasterized through the process pool in the background
+    instead, while the line store fills; its image is blitted once ready.
+    """
+    global scene_progress
+    palette_map = scene_palette_map(scene.palette)
+    scene_progress = (0, len(scene))
+    pooled = None
+    if RASTER_WORKERS > 1 and len(scene) >= raster_pool.MIN_PARALLEL_LINES:
+        pooled = scene_pool.submit(rasterize_scene, scene, palette_map)
+    for endpoints, colors in scene_chunks(scene, palette_map):
+        lines.extend(endpoints, colors)
+        if pooled is None:
+            canvas.rasterize(endpoints, colors)
+        cell_index.clear()  # Tiles loaded mid-stream would miss the new lines
+        scene_progress = (len(lines), len(scene))
+        yield
+    if pooled is None:
+        return
+    while not wait((pooled,), SCENE_CHUNK_SECONDS).done:
+        yield  # Keep handling input while the workers paint
+    result = pooled.result()
+    if result is not None:
+        canvas.blit(*result)
+        return
+    for endpoints, colors in scene_chunks(scene, palette_map):  # Box too large for the pool: paint here
+        canvas.rasterize(endpoints, colors)
+        yield
+
+def scene_chunks(scene, palette_map):
+    """
+    (endpoints, color_options indices) of the scene in draw order, in chunks
+    sized so the caller's work on each takes about SCENE_CHUNK_SECONDS.
+    """
+    start, size = 0, 1_000
+    while start < len(scene):
+        began = time.perf_counter()
+        endpoints = scene.endpoints(start, start + size)
+        yield endpoints, palette_map[scene.colors(start, start + size)]
+        start += len(endpoints)
+        elapsed = max(time.perf_counter() - began, 1e-4)
+        size = max(100, min(int(size * SCENE_CHUNK_SECONDS / elapsed), 1_000_000))
+
+def ingest_scene_chunk():
+    """Load the next chunk of a streaming scene; called once per frame."""
+    global scene_loader, panels_dirty
+    if scene_loader is None:
+        return
+    if next(scene_loader, StopIteration) is StopIteration:
+        scene_loader = None
+    compose_region(line_layer.get_rect())
+    panels_dirty = True
+
+def finish_scene_load():
+    """Ingest the rest of a streaming scene at once, before an edit touches the lines."""
+    while scene_loader is not None:
+        ingest_scene_chunk()
+
+def draw_grid_panel(surface, rect):
+    """Blit the changed parts of the line layer, then the selection, preview line and hover outline."""
+    global grid_dirty_rects, overlay_rect, overlay_state
+    selected = lines.get(selected_line_id) if selected_line_id is not None else None
+    state = (point_a, hover_cell, DEFAULT_LINE_COLOR, selected_line_id, cell_size, tuple(view_offset))
+    dirty = grid_dirty_rects
+    grid_dirty_rects = []
+    if state != overlay_state:
+        new_overlay = None
+        if hover_cell:
+            new_overlay = line_bounds(point_a, hover_cell) if point_a else cell_rect(hover_cell)
+        if selected:
+            selected_bounds = line_bounds(selected[0], selected[1])
+            new_overlay = new_overlay.union(selected_bounds) if new_overlay else selected_bounds
+        dirty += [r for r in (overlay_rect, new_overlay) if r]
+        overlay_rect, overlay_state = new_overlay, state
+    dirty = [r for r in dirty if r.width and r.height]
+    if not dirty:
+        return []
+    for region in dirty:
+        surface.blit(line_layer, region.move(rect.topleft), region)
+    surface.set_clip(rect)  # Overlay cells outside the view must not spill onto the panels
+    outline = 3 if cell_size >= MIN_GRID_LINE_CELL else 0
+    if selected:
+        for pt in dda_line_points(selected[0], selected[1]):
+            pygame.draw.rect(surface, SELECTION_COLOR, cell_rect(pt).move(rect.topleft), outline)
     if point_a and hover_cell:
         for pt in dda_line_points(point_a, hover_cell):
-            pygame.draw.rect(surface, DEFAULT_LINE_COLOR,
-                             pygame.Rect(rect.x + pt[0] * CELL_SIZE, rect.y + pt[1] * CELL_SIZE, CELL_SIZE, CELL_SIZE))
+            pygame.draw.rect(surface, DEFAULT_LINE_COLOR, cell_rect(pt).move(rect.topleft))
     if hover_cell:
-        pygame.draw.rect(surface, (180, 180, 255),
-                         pygame.Rect(rect.x + hover_cell[0] * CELL_SIZE, rect.y + hover_cell[1] * CELL_SIZE, CELL_SIZE, CELL_SIZE), 2)
+        pygame.draw.rect(surface, (180, 180, 255), cell_rect(hover_cell).move(rect.topleft), 2 if outline else 0)
+    surface.set_clip(None)
+    return [region.move(rect.topleft) for region in dirty]
+
+def draw_profile_overlay(surface, rect):
+    pygame.draw.rect(surface, LIGHT_GRAY, rect)
+    pygame.draw.rect(surface, BLACK, rect, 2)
+    font = text_cache.font(20)  # Numbers change every frame, so skip the text cache
+    for row, text in enumerate(frame_stats.summary()):
+        surface.blit(font.render(text, True, BLACK), (rect.x + 8, rect.y + 6 + row * 18))
+
+def toggle_profile_overlay():
+    frame_stats.enabled = not frame_stats.enabled
+    if not frame_stats.enabled:
+        frame_stats.clear()
+        grid_dirty_rects.append(layout["profile"].copy())  # Uncover the grid under it
 
 def draw_ui_panels(surface):
-    status_rect = pygame.Rect(0, 0, LEFT_PANEL_WIDTH, STATUS_PANEL_HEIGHT)
-    control_rect = pygame.Rect(0, STATUS_PANEL_HEIGHT, LEFT_PANEL_WIDTH, CONTROL_PANEL_HEIGHT)
-    color_panel_rect = pygame.Rect(0, STATUS_PANEL_HEIGHT + CONTROL_PANEL_HEIGHT, LEFT_PANEL_WIDTH, COLOR_PANEL_HEIGHT)
-    table_rect = pygame.Rect(0, STATUS_PANEL_HEIGHT + CONTROL_PANEL_HEIGHT + COLOR_PANEL_HEIGHT, LEFT_PANEL_WIDTH, TABLE_PANEL_HEIGHT)
-    grid_rect = pygame.Rect(LEFT_PANEL_WIDTH, 0, RIGHT_PANEL_WIDTH, WINDOW_HEIGHT)
-    draw_status_panel(surface, status_rect)
-    draw_control_panel(surface, control_rect)
-    draw_color_panel(surface, color_panel_rect)
-    draw_table_panel(surface, table_rect)
-    draw_grid_panel(surface, grid_rect)
-    return status_rect, control_rect, color_panel_rect, table_rect, grid_rect
+    """Redraw what changed since the last frame and return the dirty screen rects."""
+    global panels_dirty
+    compute_layout(surface.get_size())
+    dirty = []
+    if panels_dirty:
+        surface.set_clip(layout["left"])  # Keep panel overdraw off the retained grid
+        with frame_stats.measure("status"):
+            draw_status_panel(surface, layout["status"])
+        with frame_stats.measure("control"):
+            draw_control_panel(surface, layout["control"])
+        with frame_stats.measure("color"):
+            draw_color_panel(surface, layout["color"])
+        with frame_stats.measure("table"):
+            draw_table_panel(surface, layout["table"])
+        surface.set_clip(None)
+        dirty.append(layout["left"])
+        panels_dirty = False
+    with frame_stats.measure("grid"):
+        dirty += draw_grid_panel(surface, layout["grid"])
+    if frame_stats.enabled and dirty:  # Opaque, so redrawing it on top of any change is enough
+        profile_rect = layout["profile"].move(layout["grid"].topleft)
+        draw_profile_overlay(surface, profile_rect)
+        dirty.append(profile_rect)
+    return dirty
+
+def coalesce_motion(events):
+    """Merge each run of queued MOUSEMOTION events into one at the latest position."""
+    merged = []
+    for event in events:
+        if event.type == pygame.MOUSEMOTION and merged and merged[-1].type == pygame.MOUSEMOTION:
+            last = merged[-1]
+            rel = (last.rel[0] + event.rel[0], last.rel[1] + event.rel[1])
+            merged[-1] = pygame.event.Event(pygame.MOUSEMOTION, pos=event.pos, rel=rel, buttons=event.buttons)
+        else:
+            merged.append(event)
+    return merged
+
+def animating():
+    """True while something changes without input, so the loop must not block."""
+    return scene_loader is not None
 
 # --- Main Loop ---
-def main():
-    global point_a, hover_cell, DEFAULT_LINE_COLOR, continuous_mode
+def main(headless=False, scene=None):
+    global point_a, hover_cell, DEFAULT_LINE_COLOR, continuous_mode, panels_dirty
+    global table_scroll, table_drag_offset, goto_buffer, active_tool, selected_line_id, status_message
+    init_display(headless)
+    table_rect, grid_rect = layout["table"], layout["grid"]
+    rebuild_line_layer(grid_rect)
+    if scene is not None:
+        open_scene_file(scene)
+    panning = False
+    screen.fill(DARK_GRAY)
+    draw_ui_panels(screen)
+    pygame.display.flip()
     running = True
+    last_poll = time.perf_counter()
     while running:
-        for event in pygame.event.get():
+        if animating():
+            events = pygame.event.get()
+            arrival = last_poll  # Queued since the last poll; the earliest they can have come in
+        else:
+            events = [pygame.event.wait()]  # Idle: sleep until there is input
+            arrival = time.perf_counter()
+            events += pygame.event.get()
+        frame_start = last_poll = time.perf_counter()
+        exposed = False
+        for event in coalesce_motion(events):
             if event.type == pygame.QUIT:
                 running = False
 
+            elif event.type in (pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED, pygame.VIDEOEXPOSE):
+                exposed = True  # The window contents were lost; present the whole screen again
+
             elif event.type == pygame.MOUSEBUTTONDOWN:
+                if event.button in (4, 5):
+                    continue  # Wheel clicks, handled as MOUSEWHEEL
+                status_message = None
+                if event.button in (2, 3) and grid_rect.collidepoint(event.pos):
+                    panning = True  # Middle or right drag pans the grid
+                    continue
+                panels_dirty = True
                 if event.pos[0] < LEFT_PANEL_WIDTH and STATUS_PANEL_HEIGHT <= event.pos[1] < STATUS_PANEL_HEIGHT + CONTROL_PANEL_HEIGHT:
                     if control_toggle_rect and control_toggle_rect.collidepoint(event.pos):
                         continuous_mode = not continuous_mode
                         continue
+                    if control_tool_rect and control_tool_rect.collidepoint(event.pos):
+                        active_tool = TOOLS[(TOOLS.index(active_tool) + 1) % len(TOOLS)]
+                        point_a = None
+                        continue
                     if control_undo_rect and control_undo_rect.collidepoint(event.pos):
                         if point_a is not None:
                             point_a = None
-                        elif lines:
-                            lines.pop()
+                        else:
+                            undo()
                         continue
+                    if control_redo_rect and control_redo_rect.collidepoint(event.pos):
+                        redo()
+                        continue
+
+                if table_track_rect and table_track_rect.collidepoint(event.pos):
+                    if table_thumb_rect.collidepoint(event.pos):
+                        table_drag_offset = event.pos[1] - table_thumb_rect.y
+                    else:
+                        table_drag_offset = table_thumb_rect.height // 2
+                        scroll_table_to_thumb(event.pos[1], table_rect)
+                    continue
 
-                for line in lines.copy():
-                    if "delete_rect" in line and line["delete_rect"].collidepoint(event.pos):
-                        lines.remove(line)
-                        break
+                line_id, on_delete = table_hit(event.pos, table_rect)
+                if on_delete:
+                    remove_line(line_id)
+                elif line_id is not None:
+                    selected_line_id = None if selected_line_id == line_id else line_id
 
                 if event.pos[0] < LEFT_PANEL_WIDTH:
                     if event.pos[1] < STATUS_PANEL_HEIGHT + CONTROL_PANEL_HEIGHT:
                         pass
                     elif event.pos[1] < STATUS_PANEL_HEIGHT + CONTROL_PANEL_HEIGHT + COLOR_PANEL_HEIGHT:
-                        for swatch in get_color_swatches(pygame.Rect(0, STATUS_PANEL_HEIGHT + CONTROL_PANEL_HEIGHT, LEFT_PANEL_WIDTH, COLOR_PANEL_HEIGHT)):
+                        for swatch in layout["swatches"]:
                             if swatch["rect"].collidepoint(event.pos):
-                                DEFAULT_LINE_COLOR = swatch["color"]
+                                if selected_line_id is not None and pygame.key.get_mods() & pygame.KMOD_SHIFT:
+                                    recolor_line(selected_line_id, swatch["color"])  # Shift+click recolors the selection
+                                else:
+                                    DEFAULT_LINE_COLOR = swatch["color"]
                                 break
                 elif event.pos[0] >= LEFT_PANEL_WIDTH:
-                    grid_rect = pygame.Rect(LEFT_PANEL_WIDTH, 0, RIGHT_PANEL_WIDTH, WINDOW_HEIGHT)
-                    cell = get_cell(event.pos, grid_rect, CELL_SIZE)
-                    if cell:
+                    cell = get_cell(event.pos, grid_rect, cell_size, view_offset)
+                    if cell and active_tool != "Draw":
+                        line_id = cell_index.topmost(cell)
+                        if line_id is None:
+                            selected_line_id = None
+                        elif active_tool == "Erase":
+                            remove_line(line_id)
+                        else:
+                            selected_line_id = line_id
+                            jump_to_line(table_number(line_id), table_rect)
+                    elif cell:
                         if point_a is None:
                             point_a = cell
                         else:
-                            lines.append({"start": point_a, "end": cell, "color": DEFAULT_LINE_COLOR})
+                            add_line(point_a, cell, DEFAULT_LINE_COLOR)
                             if continuous_mode:
                                 point_a = cell
                             else:
                                 point_a = None
 
+            elif event.type == pygame.MOUSEBUTTONUP:
+                table_drag_offset = None
+                panning = False
+
+            elif event.type == pygame.MOUSEWHEEL:
+                mouse_pos = pygame.mouse.get_pos()
+                if table_rect.collidepoint(mouse_pos):
+                    table_scroll -= event.y * 3
+                    clamp_table_scroll(table_rect)
+                    panels_dirty = True
+                elif grid_rect.collidepoint(mouse_pos):
+                    zoom_view(event.y, (mouse_pos[0] - grid_rect.x, mouse_pos[1] - grid_rect.y))
+
+            elif event.type == pygame.KEYDOWN:
+                status_message = None
+                if event.mod & pygame.KMOD_CTRL and event.key in (pygame.K_z, pygame.K_y):
+                    if event.key == pygame.K_y or event.mod & pygame.KMOD_SHIFT:
+                        redo()
+                    else:
+                        undo()
+                elif event.mod & pygame.KMOD_CTRL and event.key == pygame.K_s:
+                    save_scene_file(scene_path)
+                elif event.mod & pygame.KMOD_CTRL and event.key == pygame.K_o:
+                    if unsaved_changes and not event.mod & pygame.KMOD_SHIFT:
+                        status_message = "Unsaved changes: Ctrl+S saves them, Ctrl+Shift+O reloads anyway"
+                    elif os.path.exists(scene_path):
+                        open_scene_file(scene_path)
+                elif event.unicode and event.unicode in "0123456789":
+                    goto_buffer += event.unicode
+                elif event.key == pygame.K_BACKSPACE:
+                    goto_buffer = goto_buffer[:-1]
+                elif event.key in (pygame.K_RETURN, pygame.K_KP_ENTER) and goto_buffer:
+                    jump_to_line(int(goto_buffer), table_rect)
+                    goto_buffer = ""
+                elif event.key == pygame.K_ESCAPE:
+                    goto_buffer = ""
+                elif event.key in (pygame.K_PAGEUP, pygame.K_PAGEDOWN):
+                    page = table_page_rows(table_rect)
+                    table_scroll += page if event.key == pygame.K_PAGEDOWN else -page
+                    clamp_table_scroll(table_rect)
+                elif event.key in PAN_KEYS:
+                    pan_view(PAN_KEYS[event.key][0] * grid_rect.width // 4, PAN_KEYS[event.key][1] * grid_rect.height // 4)
+                elif event.unicode in ("+", "=", "-"):
+                    zoom_view(-1 if event.unicode == "-" else 1, (grid_rect.width // 2, grid_rect.height // 2))
+                elif event.key == pygame.K_HOME:
+                    reset_view()
+                elif event.key == pygame.K_F3:
+                    toggle_profile_overlay()
+                elif event.key == pygame.K_F4 and frame_stats.enabled:
+                    frame_stats.dump(TRACE_FILE)
+                panels_dirty = True
+
             elif event.type == pygame.MOUSEMOTION:
+                if table_drag_offset is not None:
+                    scroll_table_to_thumb(event.pos[1], table_rect)
+                    panels_dirty = True
+                if panning:
+                    pan_view(*event.rel)
+                previous_cell = hover_cell
                 if event.pos[0] >= LEFT_PANEL_WIDTH:
-                    grid_rect = pygame.Rect(LEFT_PANEL_WIDTH, 0, RIGHT_PANEL_WIDTH, WINDOW_HEIGHT)
-                    hover_cell = get_cell(event.pos, grid_rect, CELL_SIZE)
+                    hover_cell = get_cell(event.pos, grid_rect, cell_size, view_offset)
                 else:
                     hover_cell = None
+                if hover_cell != previous_cell:
+                    panels_dirty = True
 
-        screen.fill(DARK_GRAY)
-        draw_ui_panels(screen)
-        pygame.display.flip()
-        clock.tick(60)
+        ingest_scene_chunk()
+        dirty = draw_ui_panels(screen)
+        if exposed:
+            pygame.display.flip()
+        elif dirty:
+            pygame.display.update(dirty)
+        if exposed or dirty:
+            frame_stats.frame(frame_start, arrival if events else None)
+        if animating():
+            clock.tick(60)
     pygame.quit()
     sys.exit()
 
 if __name__ == "__main__":
-    main()
+    args = sys.argv[1:]
+    scene_args = [arg for arg in args if not arg.startswith("--")]
+    main(headless="--headless" in args, scene=scene_args[0] if scene_args else None)
@@ -0,0 +1,148 @@
+"""
+Parallel line rasterization
+
+Splits a draw-ordered list of lines across a process pool and builds the
+same uint8 cell image (palette index + 1, 0 = empty) as painting them one
+after another on a single core, byte for byte.
+
+Two partitions are available:
+    batches  each worker paints a contiguous run of lines into its own
+             shared buffer; the buffers are then composited in run order,
+             so a later line still covers an earlier one
+    bands    each worker owns a horizontal band of the image and paints
+             every line crossing it, in order, straight into the shared
+             output; no compositing, but lines spanning several bands are
+             traced once per band
+
+Lines and buffers live in multiprocessing shared memory, handed to the
+workers once through the pool initializer. Workers are spawned rather than
+forked: the UI process has SDL threads running, and a fork taken while one
+of them holds a lock can leave the child stuck.
+
+python raster_pool.py                       (scaling benchmark, 1..cpu_count workers)
+python raster_pool.py --lines 2000000 --workers 1,2,4
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from tiles import paint_cells
+
+CHUNK_LINES = 250_000       # Lines traced per dda_batch call inside a worker
+MIN_PARALLEL_LINES = 200_000  # Below this spawning the workers costs more than it saves
+MAX_IMAGE_CELLS = 1 << 26   # Largest box rasterized as one cell image; callers split or fall back beyond it
+BATCH_BUFFER_LIMIT = 256 << 20  # Bytes of per-worker buffers before "batches" gives way to "bands"
+
+_shared = {}  # Worker-side views of the shared arrays, set by _init_worker
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+def _shared_array(shape, dtype):
+    dtype = np.dtype(dtype)
+    raw = multiprocessing.RawArray("B", max(1, int(np.prod(shape)) * dtype.itemsize))
+    return raw, np.frombuffer(raw, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+
+def _init_worker(endpoints_raw, colors_raw, count, image_raws, shape):
+    _shared["endpoints"] = np.frombuffer(endpoints_raw, dtype=np.int32, count=4 * count).reshape(count, 4)
+    _shared["colors"] = np.frombuffer(colors_raw, dtype=np.uint8, count=count)
+    _shared["images"] = [np.frombuffer(raw, dtype=np.uint8, count=shape[0] * shape[1]).reshape(shape) for raw in image_raws]
+
+def paint_lines(image, endpoints, colors, origin, chunk=CHUNK_LINES):
+    """Single-core reference: paint every line in order, `chunk` lines at a time."""
+    for start in range(0, len(endpoints), chunk):
+        paint_cells(image, endpoints[start:start + chunk], colors[start:start + chunk], origin)
+
+def _paint_batch(job):
+    """Paint lines start:stop into buffer `slot`."""
+    slot, start, stop, origin = job
+    paint_lines(_shared["images"][slot], _shared["endpoints"][start:stop], _shared["colors"][start:stop], origin)
+
+def _paint_band(job):
+    """Paint every line crossing image rows row0:row1 into that band of the output."""
+    row0, row1, origin = job
+    endpoints = _shared["endpoints"]
+    y0, y1 = origin[1] + row0, origin[1] + row1 - 1
+    crossing = np.flatnonzero((np.minimum(endpoints[:, 1], endpoints[:, 3]) <= y1)
+                              & (np.maximum(endpoints[:, 1], endpoints[:, 3]) >= y0))
+    paint_lines(_shared["images"][0][row0:row1], endpoints[crossing], _shared["colors"][crossing], (origin[0], y0))
+
+def choose_strategy(shape, workers):
+    return "batches" if workers * shape[0] * shape[1] <= BATCH_BUFFER_LIMIT else "bands"
+
+def rasterize(endpoints, colors, box, workers=None, strategy=None):
+    """
+    uint8 cell image of N x 4 endpoints with palette indices over the
+    inclusive cell box (x0, y0, x1, y1), painted in the given order.
+    Runs on one core when workers is 1 or the scene is small.
+    """
+    x0, y0, x1, y1 = box
+    shape = (y1 - y0 + 1, x1 - x0 + 1)
+    workers = default_workers() if workers is None else workers
+    count = len(endpoints)
+    if workers <= 1 or count < MIN_PARALLEL_LINES:
+        image = np.zeros(shape, dtype=np.uint8)
+        paint_lines(image, endpoints, colors, (x0, y0))
+        return image
+    strategy = strategy or choose_strategy(shape, workers)
+    workers = min(workers, count if strategy == "batches" else shape[0])
+    endpoints_raw, shared_endpoints = _shared_array((count, 4), np.int32)
+    colors_raw, shared_colors = _shared_array((count,), np.uint8)
+    shared_endpoints[:] = endpoints
+    shared_colors[:] = colors
+    buffers = [_shared_array(shape, np.uint8) for _ in range(workers if strategy == "batches" else 1)]
+    if strategy == "batches":
+        bounds = np.linspace(0, count, workers + 1).astype(int).tolist()
+        jobs, task = [(k, bounds[k], bounds[k + 1], (x0, y0)) for k in range(workers)], _paint_batch
+    elif strategy == "bands":
+        bounds = np.linspace(0, shape[0], workers + 1).astype(int).tolist()
+        jobs, task = [(bounds[k], bounds[k + 1], (x0, y0)) for k in range(workers)], _paint_band
+    else:
+        raise ValueError(f"unknown strategy {strategy!r}")
+    initargs = (endpoints_raw, colors_raw, count, [raw for raw, _ in buffers], shape)
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=initargs) as pool:
+        list(pool.map(task, jobs))  # Re-raises worker errors; a dead worker raises BrokenProcessPool
+    image = buffers[0][1].copy()
+    for _, layer in buffers[1:]:  # Later batches hold later lines, so they go on top
+        np.copyto(image, layer, where=layer != 0)
+    return image
+
+# --- Scaling benchmark ---
+def bench(num_lines, worker_counts, strategies, size=2000, length=60, seed=0):
+    """Time rasterize() for each worker count and check it against the single-core image."""
+    rng = np.random.default_rng(seed)
+    starts = rng.integers(0, size, size=(num_lines, 2))
+    ends = np.clip(starts + rng.integers(-length, length + 1, size=(num_lines, 2)), 0, size - 1)
+    endpoints = np.concatenate([starts, ends], axis=1).astype(np.int32)
+    colors = (np.arange(num_lines) % 8).astype(np.uint8)
+    box = (0, 0, size - 1, size - 1)
+    began = time.perf_counter()
+    reference = rasterize(endpoints, colors, box, workers=1)
+    single = time.perf_counter() - began
+    print(f"{num_lines} lines on a {size}x{size} grid, 1 worker: {single:.3f}s")
+    print(f"{'strategy':<10}{'workers':>8}{'seconds':>10}{'speedup':>9}  identical")
+    for strategy in strategies:
+        for workers in worker_counts:
+            began = time.perf_counter()
+            image = rasterize(endpoints, colors, box, workers=workers, strategy=strategy)
+            elapsed = time.perf_counter() - began
+            print(f"{strategy:<10}{workers:>8}{elapsed:>10.3f}{single / elapsed:>8.2f}x  {np.array_equal(image, reference)}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    parser.add_argument("--workers", default=",".join(map(str, range(1, default_workers() + 1))),
+                        help="comma separated worker counts")
+    parser.add_argument("--strategies", default="batches,bands")
+    args = parser.parse_args()
+    bench(args.lines, [int(w) for w in args.workers.split(",")], args.strategies.split(","))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+DDA scene files
+
+Binary layout, little endian:
+    header   magic "DDAS", u16 version, u16 palette size, u32 record offset, u64 line count
+    palette  palette size x (r, g, b) bytes
+    records  line count x 17 bytes: i32 x1, y1, x2, y2 and u8 palette index, in draw order
+
+Files are opened with a memory map, so a multi-million line scene is
+available immediately and read chunk by chunk. export_png rasterizes a
+scene with the dda_line_points rules and writes a PNG without pygame,
+working in bands of rows so the image never has to fit in memory.
+
+python scene_file.py info scene.dda
+python scene_file.py export scene.dda out.png --cell 4 --workers 0
+"""
+
+import argparse
+import os
+import struct
+import zlib
+
+import numpy as np
+
+import raster_pool
+from tiles import paint_cells
+
+MAGIC = b"DDAS"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIQ")
+RECORD = np.dtype([("x1", "<i4"), ("y1", "<i4"), ("x2", "<i4"), ("y2", "<i4"), ("color", "u1")])
+CHUNK_LINES = 100_000
+BACKGROUND = (255, 255, 255)
+UNKNOWN_COLOR = (0, 0, 0)  # Drawn for a record whose palette index is past the end of the palette
+BAND_PIXELS = 1 << 22      # Output pixels per band when exporting, about 12 MB of RGB
+PNG_MAX_SIDE = (1 << 31) - 1
+
+
+class Scene:
+    """A scene file mapped into memory; records are read only when sliced."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size or header[:4] != MAGIC:
+                raise ValueError(f"{path} is not a DDA scene file")
+            magic, version, palette_size, offset, count = HEADER.unpack(header)
+            if version != VERSION:
+                raise ValueError(f"{path} has unsupported scene version {version}")
+            palette = f.read(3 * palette_size)
+        if len(palette) < 3 * palette_size or os.path.getsize(path) < offset + count * RECORD.itemsize:
+            raise ValueError(f"{path} is truncated")
+        self.path = path
+        self.palette = [tuple(palette[i:i + 3]) for i in range(0, len(palette), 3)]
+        self.records = np.memmap(path, dtype=RECORD, mode="r", offset=offset, shape=(count,)) if count else np.zeros(0, RECORD)
+
+    def __len__(self):
+        return len(self.records)
+
+    def endpoints(self, start=0, stop=None):
+        """N x 4 int32 (x1, y1, x2, y2) for records start:stop."""
+        chunk = self.records[start:stop]
+        return np.stack([chunk["x1"], chunk["y1"], chunk["x2"], chunk["y2"]], axis=1)
+
+    def colors(self, start=0, stop=None):
+        return np.array(self.records["color"][start:stop])
+
+    def chunks(self, size=CHUNK_LINES):
+        """(endpoints, palette indices) in draw order, `size` lines at a time."""
+        for start in range(0, len(self), size):
+            yield self.endpoints(start, start + size), self.colors(start, start + size)
+
+    def bounds(self):
+        """Inclusive cell box (x0, y0, x1, y1) covering every line, or None when empty."""
+        if not len(self):
+            return None
+        x0 = y0 = np.iinfo(np.int32).max
+        x1 = y1 = np.iinfo(np.int32).min
+        for endpoints, _ in self.chunks():
+            xs, ys = endpoints[:, 0::2], endpoints[:, 1::2]
+            x0, y0 = min(x0, int(xs.min())), min(y0, int(ys.min()))
+            x1, y1 = max(x1, int(xs.max())), max(y1, int(ys.max()))
+        return x0, y0, x1, y1
+
+
+def open_scene(path):
+    return Scene(path)
+
+def full_palette(palette):
+    """A scene palette padded with UNKNOWN_COLOR to all 256 values a record's color byte can hold."""
+    palette = list(palette[:256])
+    return palette + [UNKNOWN_COLOR] * (256 - len(palette))
+
+def save_scene(path, palette, endpoints, colors, chunk=CHUNK_LINES * 10):
+    """Write lines in draw order; endpoints is N x 4, colors are palette indices."""
+    count = len(endpoints)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(palette), HEADER.size + 3 * len(palette), count))
+        f.write(bytes(channel for color in palette for channel in color))
+        for start in range(0, count, chunk):
+            block = np.asarray(endpoints[start:start + chunk])
+            records = np.empty(len(block), dtype=RECORD)
+            records["x1"], records["y1"] = block[:, 0], block[:, 1]
+            records["x2"], records["y2"] = block[:, 2], block[:, 3]
+            records["color"] = colors[start:start + chunk]
+            f.write(records.tobytes())
+
+def save_store(path, store):
+    """Save the live lines of a LineStore."""
+    ids = store.ids()
+    save_scene(path, store.palette, store.endpoints(ids), store.color[ids])
+
+# --- Raster export ---
+def render_cells(scene, box=None, workers=1):
+    """uint8 cell image of a scene over an inclusive cell box (default: its bounds)."""
+    box = box or scene.bounds() or (0, 0, 0, 0)
+    x0, y0, x1, y1 = box
+    if (x1 - x0 + 1) * (y1 - y0 + 1) > raster_pool.MAX_IMAGE_CELLS:
+        raise ValueError(f"box {box} has more than {raster_pool.MAX_IMAGE_CELLS} cells; export_png renders it in bands")
+    if workers != 1:
+        return raster_pool.rasterize(scene.endpoints(), scene.colors(), box, workers)
+    image = np.zeros((y1 - y0 + 1, x1 - x0 + 1), dtype=np.uint8)
+    for endpoints, colors in scene.chunks():
+        paint_cells(image, endpoints, colors, (x0, y0))
+    return image
+
+def band_lines(scene, box, rows):
+    """
+    Lines crossing each band of `rows` cell rows of the box, as (ids,
+    offsets): band b draws ids[offsets[b]:offsets[b + 1]], in draw order.
+    """
+    x0, y0, x1, y1 = box
+    records = scene.records
+    low = np.minimum(records["y1"], records["y2"]); high = np.maximum(records["y1"], records["y2"])
+    inside = (low <= y1) & (high >= y0) \
+        & (np.minimum(records["x1"], records["x2"]) <= x1) & (np.maximum(records["x1"], records["x2"]) >= x0)
+    ids = np.flatnonzero(inside)
+    first = (np.maximum(low[ids], y0) - y0) // rows
+    spans = (np.minimum(high[ids], y1) - y0) // rows - first + 1
+    starts = np.repeat(np.cumsum(spans) - spans, spans)
+    bands = np.repeat(first, spans) + np.arange(int(spans.sum())) - starts
+    ids = np.repeat(ids, spans)
+    order = np.argsort(bands, kind="stable")  # ids stay ascending inside each band
+    offsets = np.zeros((y1 - y0) // rows + 2, dtype=np.int64)
+    np.cumsum(np.bincount(bands, minlength=len(offsets) - 1), out=offsets[1:])
+    return ids[order], offsets
+
+def band_rows(width, cell_size=1):
+    """Cell rows per export band for a box `width` cells wide, within BAND_PIXELS."""
+    return max(1, BAND_PIXELS // (width * cell_size * cell_size))
+
+def render_bands(scene, box, rows=None):
+    """Yield the cell image of the box as consecutive bands of rows, top to bottom."""
+    x0, y0, x1, y1 = box
+    rows = rows or band_rows(x1 - x0 + 1)
+    ids, offsets = band_lines(scene, box, rows)
+    for band, top in enumerate(range(y0, y1 + 1, rows)):
+        image = np.zeros((min(rows, y1 - top + 1), x1 - x0 + 1), dtype=np.uint8)
+        picks = ids[offsets[band]:offsets[band + 1]]
+        if len(picks):
+            records = scene.records[picks]
+            endpoints = np.stack([records["x1"], records["y1"], records["x2"], records["y2"]], axis=1)
+            raster_pool.paint_lines(image, endpoints, records["color"], (x0, top))
+        yield image
+
+def cells_to_rgb(image, palette, cell_size=1, background=BACKGROUND):
+    lut = np.array([background] + full_palette(palette), dtype=np.uint8)
+    rgb = lut[image]
+    if cell_size > 1:
+        rgb = rgb.repeat(cell_size, axis=0).repeat(cell_size, axis=1)
+    return rgb
+
+def _png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+def write_png_rows(path, width, height, blocks):
+    """Write an 8-bit RGB PNG from H_i x W x 3 uint8 row blocks, compressing as they arrive."""
+    if not (0 < width <= PNG_MAX_SIDE and 0 < height <= PNG_MAX_SIDE):
+        raise ValueError(f"a {width}x{height} image does not fit in a PNG")
+    compressor = zlib.compressobj(6)
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(_png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        for rgb in blocks:
+            rows = np.zeros((len(rgb), 1 + 3 * width), dtype=np.uint8)  # Filter byte 0 on every row
+            rows[:, 1:] = rgb.reshape(len(rgb), 3 * width)
+            data = compressor.compress(rows)
+            if data:
+                f.write(_png_chunk(b"IDAT", data))
+        f.write(_png_chunk(b"IDAT", compressor.flush()))
+        f.write(_png_chunk(b"IEND", b""))
+
+def write_png(path, rgb):
+    """Write an H x W x 3 uint8 array as an 8-bit RGB PNG."""
+    write_png_rows(path, rgb.shape[1], rgb.shape[0], [rgb])
+
+def export_png(scene_path, png_path, cell_size=1, box=None, workers=1):
+    """
+    Render a scene to PNG, expanding and compressing it a band of at most
+    BAND_PIXELS output pixels at a time. With workers the cells of the box
+    are rasterized in one pool call when it is small enough.
+    """
+    scene = open_scene(scene_path)
+    box = box or scene.bounds() or (0, 0, 0, 0)
+    x0, y0, x1, y1 = box
+    rows = band_rows(x1 - x0 + 1, cell_size)
+    if workers != 1 and (x1 - x0 + 1) * (y1 - y0 + 1) <= raster_pool.MAX_IMAGE_CELLS:
+        image = render_cells(scene, box, workers)
+        bands = (image[top:top + rows] for top in range(0, len(image), rows))
+    else:
+        bands = render_bands(scene, box, rows)
+    blocks = (cells_to_rgb(band, scene.palette, cell_size) for band in bands)
+    write_png_rows(png_path, (x1 - x0 + 1) * cell_size, (y1 - y0 + 1) * cell_size, blocks)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    info = commands.add_parser("info", help="print the line count, palette and bounds")
+    info.add_argument("scene")
+    export = commands.add_parser("export", help="rasterize a scene to PNG")
+    export.add_argument("scene")
+    export.add_argument("png")
+    export.add_argument("--cell", type=int, default=1, help="pixels per cell")
+    export.add_argument("--box", help="x0,y0,x1,y1 inclusive cell box, default the scene bounds")
+    export.add_argument("--workers", type=int, default=1, help="rasterizing processes, 0 for one per CPU")
+    args = parser.parse_args()
+    if args.command == "info":
+        scene = open_scene(args.scene)
+        print(f"lines: {len(scene)}\npalette: {scene.palette}\nbounds: {scene.bounds()}")
+    else:
+        box = tuple(int(v) for v in args.box.split(",")) if args.box else None
+        export_png(args.scene, args.png, args.cell, box, args.workers or None)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Cell occupancy index
+
+Maps each grid cell to the ids of the lines covering it, kept in draw
+order (ascending id) so the topmost line at a cell is the last live entry.
+Removals are lazy: the id is marked dead and trimmed off the end of each
+cell list, and buried entries are skipped until the next compaction.
+
+With a loader the index is filled one tile at a time, the first time a
+query touches that tile, so a large scene costs nothing until it is
+clicked. Edits only update tiles that are already loaded; the others pick
+the change up from the loader when they load.
+"""
+
+from bisect import bisect_left
+
+import numpy as np
+
+
+class CellIndex:
+    def __init__(self, loader=None, tile_shift=8, compact_after=100_000):
+        self.cells = {}     # (x, y) -> ascending list of line ids
+        self.dead = set()   # Removed ids that may still be buried in cell lists
+        self.loader = loader  # (tx, ty) -> (xs, ys, line_ids) of the live lines in that tile
+        self.tile_shift = tile_shift
+        self.loaded = set()   # Tiles filled from the loader
+        self.compact_after = compact_after
+
+    def _is_loaded(self, cell):
+        return self.loader is None or (cell[0] >> self.tile_shift, cell[1] >> self.tile_shift) in self.loaded
+
+    def _ensure(self, cell):
+        if self.loader is None:
+            return
+        key = (cell[0] >> self.tile_shift, cell[1] >> self.tile_shift)
+        if key not in self.loaded:
+            self.loaded.add(key)
+            self.add_many(*self.loader(*key))
+
+    def add(self, line_id, points):
+        self.dead.discard(line_id)
+        for cell in points:
+            if not self._is_loaded(cell):
+                continue
+            ids = self.cells.get(cell)
+            if ids is None:
+                self.cells[cell] = [line_id]
+            elif ids[-1] < line_id:
+                ids.append(line_id)  # New lines are drawn on top
+            else:
+                i = bisect_left(ids, line_id)  # Restored line goes back to its draw position
+                if i == len(ids) or ids[i] != line_id:
+                    ids.insert(i, line_id)
+
+    def add_many(self, xs, ys, line_ids):
+        """Bulk add: cell (xs[i], ys[i]) is covered by line_ids[i], e.g. dda_batch output."""
+        if not len(xs):
+            return
+        if self.dead:
+            self.dead.difference_update(np.unique(line_ids).tolist())
+        order = np.lexsort((line_ids, ys, xs))
+        xs, ys, line_ids = xs[order], ys[order], line_ids[order]
+        starts = np.flatnonzero(np.r_[True, (xs[1:] != xs[:-1]) | (ys[1:] != ys[:-1])])
+        ends = np.r_[starts[1:], len(order)]
+        for x, y, start, end in zip(xs[starts].tolist(), ys[starts].tolist(), starts.tolist(), ends.tolist()):
+            new_ids = line_ids[start:end].tolist()
+            ids = self.cells.get((x, y))
+            if ids is None:
+                self.cells[(x, y)] = new_ids
+            elif ids[-1] < new_ids[0]:
+                ids.extend(new_ids)
+            else:
+                for line_id in new_ids:
+                    self.add(line_id, [(x, y)])
+
+    def remove(self, line_id, points):
+        self.dead.add(line_id)
+        for cell in points:
+            self._trim(cell)
+        if len(self.dead) > self.compact_after:
+            self.compact()
+
+    def _trim(self, cell):
+        ids = self.cells.get(cell)
+        while ids and ids[-1] in self.dead:
+            ids.pop()
+        if not ids:
+            self.cells.pop(cell, None)
+        return ids
+
+    def topmost(self, cell):
+        """Id of the last-drawn line covering cell, or None."""
+        self._ensure(cell)
+        ids = self._trim(cell)
+        return ids[-1] if ids else None
+
+    def lines_at(self, cell):
+        self._ensure(cell)
+        return [line_id for line_id in self.cells.get(cell, ()) if line_id not in self.dead]
+
+    def compact(self):
+        for cell in list(self.cells):
+            ids = [line_id for line_id in self.cells[cell] if line_id not in self.dead]
+            if ids:
+                self.cells[cell] = ids
+            else:
+                del self.cells[cell]
+        self.dead.clear()
+
+    def clear(self):
+        self.cells.clear()
+        self.dead.clear()
+        self.loaded.clear()
@@ -0,0 +1,64 @@
+"""
+Property tests for dda_batch
+
+python -m pytest -q
+"""
+
+import random
+from fractions import Fraction
+
+import numpy as np
+
+from dda import dda_batch, dda_batch_lines, dda_line_points
+
+
+def random_endpoints(rng, count):
+    """Mix of short, zero-length, long and large-magnitude lines, negative coordinates included."""
+    endpoints = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.1:  # Zero length
+            x, y = rng.randint(-1000, 1000), rng.randint(-1000, 1000)
+            endpoints.append((x, y, x, y))
+        elif kind < 0.2:  # Long
+            x, y = rng.randint(-5000, 5000), rng.randint(-5000, 5000)
+            endpoints.append((x, y, x + rng.randint(-4000, 4000), y + rng.randint(-4000, 4000)))
+        elif kind < 0.4:  # Far from the origin
+            x, y = rng.randint(-10**9, 10**9), rng.randint(-10**9, 10**9)
+            endpoints.append((x, y, x + rng.randint(-500, 500), y + rng.randint(-500, 500)))
+        else:
+            endpoints.append(tuple(rng.randint(-60, 60) for _ in range(4)))
+    return endpoints
+
+def exact_line_points(x1, y1, x2, y2):
+    """DDA cells with the increments kept as exact fractions, rounded half to even."""
+    steps = max(abs(x2 - x1), abs(y2 - y1))
+    if steps == 0:
+        return [(x1, y1)]
+    return [(round(x1 + Fraction(i * (x2 - x1), steps)), round(y1 + Fraction(i * (y2 - y1), steps)))
+            for i in range(steps + 1)]
+
+def test_batch_matches_dda_line_points():
+    rng = random.Random(1)
+    for _ in range(10):
+        endpoints = random_endpoints(rng, 200)
+        for (x1, y1, x2, y2), points in zip(endpoints, dda_batch_lines(endpoints)):
+            assert points == dda_line_points((x1, y1), (x2, y2)), (x1, y1, x2, y2)
+
+def test_fixed_point_matches_exact_rounding():
+    rng = random.Random(2)
+    for _ in range(5):
+        endpoints = random_endpoints(rng, 100)
+        for line, points in zip(endpoints, dda_batch_lines(endpoints, fixed_point=True)):
+            assert points == exact_line_points(*line), line
+
+def test_offsets_cover_every_line():
+    endpoints = random_endpoints(random.Random(3), 500)
+    xs, ys, offsets = dda_batch(endpoints)
+    steps = [max(abs(x2 - x1), abs(y2 - y1)) for x1, y1, x2, y2 in endpoints]
+    assert np.array_equal(np.diff(offsets), np.array(steps) + 1)
+    assert len(xs) == len(ys) == offsets[-1]
+
+def test_empty_batch():
+    xs, ys, offsets = dda_batch(np.zeros((0, 4), dtype=np.int64))
+    assert len(xs) == len(ys) == 0 and offsets.tolist() == [0]
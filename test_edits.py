@@ -0,0 +1,55 @@
+"""
+Scripted edits through main's add / remove / recolor / undo / redo, checked
+against a replay of the live lines with dda_line_points
+
+python -m pytest -q
+"""
+
+import random
+
+from dda import dda_line_points
+from tiles import TILE_MASK, tile_key
+import main
+
+
+def replay():
+    """cell -> (topmost live line id, tile value) from drawing the live lines in order."""
+    cells = {}
+    for line_id in main.lines.ids():
+        start, end, color = main.lines.get(int(line_id))
+        for cell in dda_line_points(start, end):
+            cells[cell] = (int(line_id), color + 1)
+    return cells
+
+def canvas_value(cell):
+    tile = main.canvas.get(tile_key(cell))
+    return 0 if tile is None else int(tile.cells[cell[1] & TILE_MASK, cell[0] & TILE_MASK])
+
+def test_random_edits_match_replay():
+    main.init_display(headless=True)
+    main.rebuild_line_layer(main.layout["grid"])
+    rng = random.Random(11)
+    colors = [option["color"] for option in main.color_options]
+    touched = set()
+    for _ in range(400):
+        live = main.lines.ids().tolist()
+        action = rng.random()
+        if action < 0.4 or not live:
+            start = (rng.randint(-300, 300), rng.randint(-300, 300))
+            end = (start[0] + rng.randint(-40, 40), start[1] + rng.randint(-40, 40))
+            main.add_line(start, end, rng.choice(colors))
+            touched.update(dda_line_points(start, end))
+        elif action < 0.55:
+            main.remove_line(rng.choice(live))
+        elif action < 0.7:
+            main.recolor_line(rng.choice(live), rng.choice(colors))
+        elif action < 0.85:
+            main.undo()
+        else:
+            main.redo()
+        if rng.random() < 0.1:
+            expected = replay()
+            for cell in touched:
+                line_id, value = expected.get(cell, (None, 0))
+                assert canvas_value(cell) == value, cell
+                assert main.cell_index.topmost(cell) == line_id, cell
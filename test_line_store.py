@@ -0,0 +1,87 @@
+"""
+Undo / redo tests for LineStore
+
+python -m pytest -q
+"""
+
+import random
+
+import numpy as np
+
+from line_store import LineStore
+
+PALETTE = [(i, i, i) for i in range(8)]
+
+
+def snapshot(store):
+    """Live lines in draw order as (id, start, end, palette index)."""
+    return [(int(line_id), *store.get(int(line_id))) for line_id in store.ids()]
+
+def random_edit(rng, store):
+    """Append, delete or recolor a random line; False when the edit changed nothing."""
+    live = store.ids().tolist()
+    kind = rng.random()
+    if kind < 0.5 or not live:
+        store.append((rng.randint(-50, 50), rng.randint(-50, 50)), (rng.randint(-50, 50), rng.randint(-50, 50)), rng.randrange(8))
+        return True
+    if kind < 0.75:
+        store.delete(rng.choice(live))
+        return True
+    return store.set_color(rng.choice(live), rng.randrange(8))
+
+def test_random_edits_undo_and_redo_to_every_state():
+    rng = random.Random(7)
+    store = LineStore(PALETTE, capacity=1)
+    history, position = [snapshot(store)], 0  # history[position] is the current state
+    for _ in range(3000):
+        action = rng.random()
+        if action < 0.6:
+            if random_edit(rng, store):
+                del history[position + 1:]  # A new edit drops the redo tail
+                history.append(snapshot(store))
+                position += 1
+        elif action < 0.8:
+            change = store.undo()
+            assert (change is None) == (position == 0)
+            position = max(position - 1, 0)
+        else:
+            change = store.redo()
+            assert (change is None) == (position == len(history) - 1)
+            position = min(position + 1, len(history) - 1)
+        assert snapshot(store) == history[position]
+        assert len(store) == len(history[position])
+
+def test_undo_reports_the_change():
+    store = LineStore(PALETTE)
+    line_id = store.append((0, 0), (5, 5), 1)
+    assert store.set_color(line_id, 3)
+    store.delete(line_id)
+    assert store.undo() == ("added", line_id) and store.is_alive(line_id)
+    assert store.undo() == ("recolored", line_id) and store.get(line_id)[2] == 1
+    assert store.undo() == ("removed", line_id) and not store.is_alive(line_id)
+    assert store.undo() is None
+    assert store.redo() == ("added", line_id)
+    assert store.redo() == ("recolored", line_id) and store.get(line_id)[2] == 3
+
+def test_edit_after_undo_truncates_redo():
+    store = LineStore(PALETTE)
+    first = store.append((0, 0), (1, 1), 0)
+    store.append((2, 2), (3, 3), 0)
+    store.undo()
+    assert store.can_redo()
+    store.set_color(first, 2)
+    assert not store.can_redo() and store.redo() is None
+    assert [line_id for line_id, *_ in snapshot(store)] == [first]
+
+def test_unchanged_color_is_not_journaled():
+    store = LineStore(PALETTE)
+    line_id = store.append((0, 0), (1, 1), 4)
+    assert not store.set_color(line_id, 4)
+    assert store.undo() == ("removed", line_id) and not store.can_undo()
+
+def test_extend_is_not_journaled_and_costs_17_bytes_per_line():
+    store = LineStore(PALETTE, capacity=1)
+    store.extend(np.zeros((1000, 4), dtype=np.int32), np.full(1000, 5, dtype=np.uint8))
+    assert len(store) == 1000 and not store.can_undo()
+    assert store.nbytes() == 17 * 1000
+    assert (store.color[store.ids()] == 5).all()
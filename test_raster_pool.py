@@ -0,0 +1,36 @@
+"""
+raster_pool.rasterize against the single-core paint_lines
+
+python -m pytest -q
+"""
+
+import numpy as np
+import pytest
+
+import raster_pool
+
+
+def random_scene(count, size=300, length=40, seed=0):
+    """Overlapping lines with negative coordinates, so draw order decides many cells."""
+    rng = np.random.default_rng(seed)
+    starts = rng.integers(-size // 2, size // 2, size=(count, 2))
+    ends = starts + rng.integers(-length, length + 1, size=(count, 2))
+    endpoints = np.concatenate([starts, ends], axis=1).astype(np.int32)
+    return endpoints, rng.integers(0, 8, size=count).astype(np.uint8)
+
+@pytest.mark.parametrize("strategy", ["batches", "bands"])
+def test_rasterize_matches_paint_lines(monkeypatch, strategy):
+    monkeypatch.setattr(raster_pool, "MIN_PARALLEL_LINES", 100)
+    endpoints, colors = random_scene(5000)
+    box = (-200, -180, 190, 210)  # Cuts through some lines
+    reference = np.zeros((box[3] - box[1] + 1, box[2] - box[0] + 1), dtype=np.uint8)
+    raster_pool.paint_lines(reference, endpoints, colors, box[:2], chunk=700)
+    image = raster_pool.rasterize(endpoints, colors, box, workers=3, strategy=strategy)
+    assert image.dtype == np.uint8 and np.array_equal(image, reference)
+
+def test_small_scene_stays_on_one_core():
+    endpoints, colors = random_scene(50)
+    box = (-200, -200, 200, 200)
+    reference = np.zeros((401, 401), dtype=np.uint8)
+    raster_pool.paint_lines(reference, endpoints, colors, box[:2])
+    assert np.array_equal(raster_pool.rasterize(endpoints, colors, box, workers=4), reference)
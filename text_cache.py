@@ -0,0 +1,58 @@
+"""
+Text rendering cache
+
+Keeps one pygame font per size for the life of the process and memoizes
+rendered text surfaces in a bounded LRU keyed by (text, size, color, alpha).
+Returned surfaces are shared: blit them, never draw on them.
+"""
+
+from collections import OrderedDict
+
+import pygame
+
+
+class TextCache:
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self.fonts = {}                 # size -> pygame.font.Font
+        self.surfaces = OrderedDict()   # (text, size, color, alpha) -> Surface, oldest first
+        self.pinned = {}                # Static labels, never evicted
+        self.hits = 0
+        self.misses = 0
+
+    def font(self, size):
+        font = self.fonts.get(size)
+        if font is None:
+            font = self.fonts[size] = pygame.font.SysFont(None, size)
+        return font
+
+    def render(self, text, size, color, alpha=None, pin=False):
+        """Rendered surface for text; pin=True keeps it outside the LRU for good."""
+        key = (text, size, tuple(color), alpha)
+        surface = self.pinned.get(key)
+        if surface is None:
+            surface = self.surfaces.get(key)
+            if surface is not None:
+                self.surfaces.move_to_end(key)
+        if surface is not None:
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = self.font(size).render(text, True, color)
+        if alpha is not None:
+            surface.set_alpha(alpha)
+        if pin:
+            self.pinned[key] = surface
+        else:
+            self.surfaces[key] = surface
+            if len(self.surfaces) > self.max_entries:
+                self.surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
+        self.pinned.clear()
+        self.hits = self.misses = 0
+
+
+text_cache = TextCache()
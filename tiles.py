@@ -0,0 +1,140 @@
+"""
+Tiled cell canvas
+
+The unbounded grid is split into TILE_SIZE x TILE_SIZE cell tiles, created
+on first write. Each tile holds one byte per cell: 0 for empty, otherwise
+the palette index of the topmost line + 1, so it is both the occupancy and
+the color bitmap. Nothing here imports pygame.
+"""
+
+import numpy as np
+
+from dda import dda_batch
+
+TILE_SHIFT = 8
+TILE_SIZE = 1 << TILE_SHIFT  # Cells per tile side
+TILE_MASK = TILE_SIZE - 1
+MIXED_CELL = 255  # downsample() value for a block whose cells hold different colors
+
+
+class Tile:
+    __slots__ = ("cells", "version")
+
+    def __init__(self):
+        self.cells = np.zeros((TILE_SIZE, TILE_SIZE), dtype=np.uint8)  # [y, x]
+        self.version = 0  # Bumped on every write so cached surfaces can tell they are stale
+
+
+def tile_key(cell):
+    return cell[0] >> TILE_SHIFT, cell[1] >> TILE_SHIFT
+
+
+class TileCanvas:
+    def __init__(self):
+        self.tiles = {}  # (tx, ty) -> Tile
+
+    def clear(self):
+        self.tiles.clear()
+
+    def get(self, key, create=False):
+        tile = self.tiles.get(key)
+        if tile is None and create:
+            tile = self.tiles[key] = Tile()
+        return tile
+
+    def set_cells(self, cells, values):
+        """Write one value per cell; the per-cell path used for interactive edits."""
+        touched = set()
+        for (x, y), value in zip(cells, values):
+            key = (x >> TILE_SHIFT, y >> TILE_SHIFT)
+            self.get(key, create=True).cells[y & TILE_MASK, x & TILE_MASK] = value
+            touched.add(key)
+        for key in touched:
+            self.tiles[key].version += 1
+
+    def paint(self, xs, ys, values):
+        """Write cell arrays given in draw order; where a cell repeats, the last write wins."""
+        if not len(xs):
+            return
+        tx = xs >> TILE_SHIFT; ty = ys >> TILE_SHIFT
+        keys = (tx.astype(np.int64) << 32) | (ty.astype(np.int64) & 0xFFFFFFFF)
+        order = np.argsort(keys, kind="stable")  # Group by tile, keeping draw order inside each
+        keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        ends = np.r_[starts[1:], len(order)]
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            picks = order[start:end]
+            flat = (ys[picks] & TILE_MASK) * TILE_SIZE + (xs[picks] & TILE_MASK)
+            _, last = np.unique(flat[::-1], return_index=True)
+            last = len(flat) - 1 - last
+            tile = self.get((int(tx[picks[0]]), int(ty[picks[0]])), create=True)
+            tile.cells.ravel()[flat[last]] = values[picks[last]]
+            tile.version += 1
+
+    def rasterize(self, endpoints, colors, chunk=250_000):
+        """
+        Paint N x 4 endpoints with their palette indices, in order, on top of
+        what is already there. Works through `chunk` lines at a time to bound
+        the size of the batch point arrays.
+        """
+        for start in range(0, len(endpoints), chunk):
+            xs, ys, offsets = dda_batch(endpoints[start:start + chunk])
+            values = np.repeat(np.asarray(colors[start:start + chunk], dtype=np.uint8) + 1, np.diff(offsets))
+            self.paint(xs, ys, values)
+
+    def blit(self, image, origin):
+        """Paint a cell image whose top-left cell is origin; its 0 cells leave the canvas as is."""
+        x0, y0 = origin
+        height, width = image.shape
+        for ty in range(y0 >> TILE_SHIFT, ((y0 + height - 1) >> TILE_SHIFT) + 1):
+            for tx in range(x0 >> TILE_SHIFT, ((x0 + width - 1) >> TILE_SHIFT) + 1):
+                cx0, cy0 = max(tx << TILE_SHIFT, x0), max(ty << TILE_SHIFT, y0)
+                cx1, cy1 = min((tx + 1) << TILE_SHIFT, x0 + width), min((ty + 1) << TILE_SHIFT, y0 + height)
+                block = image[cy0 - y0:cy1 - y0, cx0 - x0:cx1 - x0]
+                if not block.any():
+                    continue
+                tile = self.get((tx, ty), create=True)
+                target = tile.cells[cy0 & TILE_MASK:(cy0 & TILE_MASK) + cy1 - cy0, cx0 & TILE_MASK:(cx0 & TILE_MASK) + cx1 - cx0]
+                np.copyto(target, block, where=block != 0)
+                tile.version += 1
+
+    def keys_in(self, x0, y0, x1, y1):
+        """Existing tiles overlapping cells x0..x1, y0..y1 (inclusive)."""
+        tx0, ty0 = x0 >> TILE_SHIFT, y0 >> TILE_SHIFT
+        tx1, ty1 = x1 >> TILE_SHIFT, y1 >> TILE_SHIFT
+        if (tx1 - tx0 + 1) * (ty1 - ty0 + 1) > len(self.tiles):
+            return [key for key in self.tiles if tx0 <= key[0] <= tx1 and ty0 <= key[1] <= ty1]
+        return [(tx, ty) for tx in range(tx0, tx1 + 1) for ty in range(ty0, ty1 + 1) if (tx, ty) in self.tiles]
+
+
+def paint_cells(image, endpoints, colors, origin):
+    """
+    Paint lines into a uint8 cell image (palette index + 1, 0 = empty) whose
+    top-left cell is origin. Lines are painted in order and the last write to
+    a cell wins, as when drawing one line after another; cells outside the
+    image are dropped.
+    """
+    xs, ys, offsets = dda_batch(endpoints)
+    values = np.repeat(np.asarray(colors, dtype=np.uint8) + 1, np.diff(offsets))
+    xs -= origin[0]; ys -= origin[1]
+    height, width = image.shape
+    inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+    flat = ys[inside] * width + xs[inside]
+    values = values[inside]
+    _, last = np.unique(flat[::-1], return_index=True)
+    last = len(flat) - 1 - last
+    image.ravel()[flat[last]] = values[last]
+
+def downsample(cells, factor):
+    """
+    Shrink a tile bitmap by an integer factor. A block keeps its value when
+    all of its set cells agree and becomes MIXED_CELL when they differ:
+    tiles hold no draw order, so the topmost line of a block is not known.
+    """
+    if factor == 1:
+        return cells
+    size = TILE_SIZE // factor
+    blocks = cells.reshape(size, factor, size, factor)
+    high = blocks.max(axis=(1, 3))
+    low = np.where(blocks == 0, 255, blocks).min(axis=(1, 3))  # Smallest set value
+    return np.where((high == low) | (high == 0), high, MIXED_CELL).astype(np.uint8)